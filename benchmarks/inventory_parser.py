@@ -0,0 +1,107 @@
+"""
+Inventory parser throughput benchmark.
+
+Generates 'show inventory' output for large chassis (hundreds of modules per
+device) and compares entries per second for the previous single-regex parser,
+the current precompiled regex parser and the ntc-templates TextFSM parser.
+
+Usage:
+    python benchmarks/inventory_parser.py [--devices 200] [--modules 400] [--runs 5]
+"""
+
+import argparse
+import re
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from typing import Any
+
+from rackscribe.parsers import parse_inventory_regex, parse_inventory_textfsm
+
+# Parser used before PID/VID were collected, kept as the baseline.
+_LEGACY_INVENTORY_RE = re.compile(
+    r"""
+        NAME:\s*"(?P<name>[^"]+)",\s*
+        DESCR:\s*"(?P<description>[^"]+)"\s*
+        PID:\s*[^,]*\s*,\s*
+        VID:\s*[^,]*\s*,\s*
+        SN:\s*(?P<sn>[^\r\n]*)
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+
+
+def legacy_parse(output: str) -> list[list[str]]:
+    rows: list[list[str]] = []
+    for m in _LEGACY_INVENTORY_RE.finditer(output):
+        sn = (m.group("sn") or "").strip() or "N/A"
+        rows.append([m.group("name"), m.group("description"), sn])
+    return rows
+
+
+def chassis_output(device: int, modules: int) -> str:
+    """'show inventory' output of one modular chassis, CRLF line endings as sent by devices."""
+    entries = [
+        f'NAME: "Chassis", DESCR: "Cisco Catalyst 9400 Series 10 Slot Chassis"\r\n'
+        f"PID: C9410R            , VID: V02  , SN: FXS{device:08d}\r\n"
+    ]
+    for module in range(1, modules + 1):
+        entries.append(
+            f'NAME: "Slot {module} Port {module % 48} Transceiver", '
+            f'DESCR: "10GBASE-SR SFP+ Module"\r\n'
+            f"PID: SFP-10G-SR        , VID: V0{module % 9 + 1}  , SN: AVD{device:05d}{module:04d}\r\n"
+        )
+    return "\r\n".join(entries)
+
+
+def time_parser(parse: Callable[[str], list[Any] | None], outputs: list[str], runs: int) -> float:
+    """Median seconds to parse every output once."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for output in outputs:
+            parse(output)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=200, help="Devices (default: 200).")
+    parser.add_argument(
+        "--modules", type=int, default=400, help="Modules per chassis (default: 400)."
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Runs per parser (default: 5).")
+    args = parser.parse_args()
+
+    outputs = [chassis_output(device, args.modules) for device in range(args.devices)]
+    entries = args.devices * (args.modules + 1)
+    size_mb = sum(len(output) for output in outputs) / 1_000_000
+
+    parsers: dict[str, Callable[[str], list[Any] | None]] = {
+        "legacy regex": legacy_parse,
+        "regex": parse_inventory_regex,
+        "textfsm": lambda output: parse_inventory_textfsm(output, "cisco_ios"),
+    }
+
+    counts = {name: len(parse(outputs[0]) or []) for name, parse in parsers.items()}
+    if len(set(counts.values())) != 1:
+        print(f"Parsers disagree on entry count: {counts}")
+        return 1
+
+    print(f"{args.devices} devices x {args.modules + 1} entries ({size_mb:.1f} MB)")
+    baseline = None
+    for name, parse in parsers.items():
+        seconds = time_parser(parse, outputs, args.runs)
+        baseline = baseline or seconds
+        print(
+            f"{name:<13} {seconds:8.3f}s  {entries / seconds:12,.0f} entries/s  "
+            f"{baseline / seconds:5.2f}x"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Offline throughput and memory benchmark using the replay transport.
+
+Runs gather_running_configs() and gather_serial_numbers() against simulated
+devices that serve generated 'show running-config' and 'show inventory'
+output, so rackscribe's own overhead (sessions, parsing, file writing, Excel
+formatting) is measured without real switches. Each scenario runs in a fresh
+process and reports wall-clock time, devices per second and peak RSS.
+
+Usage:
+    python benchmarks/replay.py [--sizes 10,1000,50000] [--workers 32] [--latency 0]
+                                [--failure-rate 0] [--engine thread] [--format xlsx]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+OPERATIONS = ("running-config", "inventory")
+
+_CHILD = """
+import json, resource, sys, time
+from pathlib import Path
+from rackscribe.operations import gather_running_configs, gather_serial_numbers
+from rackscribe.options import RunOptions
+
+operation, size, out_dir, workers, engine, output_format = json.loads(sys.argv[1])
+ip_list = [f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}" for n in range(1, size + 1)]
+options = RunOptions(workers=workers, engine=engine, output_format=output_format)
+start = time.perf_counter()
+if operation == "running-config":
+    gather_running_configs(ip_list, Path(out_dir), options=options)
+else:
+    gather_serial_numbers(ip_list, "Inventory", Path(out_dir), options=options)
+elapsed = time.perf_counter() - start
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    peak_kb //= 1024
+print("RESULT=" + json.dumps({"elapsed": elapsed, "peak_kb": peak_kb}))
+"""
+
+
+def write_captures(captures: Path, interfaces: int = 96, modules: int = 24) -> None:
+    """Generate shared 'default' captures: a switch config and a modular chassis inventory."""
+    default = captures / "default"
+    default.mkdir(parents=True)
+
+    config = [
+        "Building configuration...",
+        "",
+        "Current configuration : 12345 bytes",
+        "!",
+        "! Last configuration change at 10:00:00 UTC Mon Mar 4 2024 by admin",
+        "!",
+        "version 17.9",
+        "hostname {hostname}",
+        "!",
+    ]
+    for port in range(1, interfaces + 1):
+        config += [
+            f"interface GigabitEthernet1/0/{port}",
+            f" description access port {port}",
+            " switchport access vlan 10",
+            " switchport mode access",
+            " spanning-tree portfast",
+            "!",
+        ]
+    config.append("end")
+    (default / "show_running-config.txt").write_text("\n".join(config) + "\n", encoding="utf-8")
+
+    inventory = ['NAME: "Chassis", DESCR: "Cisco Catalyst 9400 Series Chassis"']
+    inventory.append("PID: C9407R            , VID: V01  , SN: FXS00000001\n")
+    for module in range(1, modules + 1):
+        inventory.append(f'NAME: "Slot {module}", DESCR: "48-Port UPOE 10/100/1000 (RJ-45)"')
+        inventory.append(f"PID: C9400-LC-48U      , VID: V02  , SN: JAE{module:08d}\n")
+    (default / "show_inventory.txt").write_text("\n".join(inventory), encoding="utf-8")
+
+
+def run_scenario(
+    operation: str,
+    size: int,
+    captures: Path,
+    args: argparse.Namespace,
+) -> dict[str, float]:
+    env = {
+        **os.environ,
+        "DEVICE_TYPE": "replay",
+        "DEVICE_USERNAME": "replay",
+        "DEVICE_PASSWORD": "replay",
+        "REPLAY_DIR": str(captures),
+        "REPLAY_LATENCY": str(args.latency),
+        "REPLAY_FAILURE_RATE": str(args.failure_rate),
+    }
+    env.pop("DEVICE_SECRET", None)
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        spec = [operation, size, out_dir, args.workers, args.engine, args.format]
+        proc = subprocess.run(
+            [sys.executable, "-c", _CHILD, json.dumps(spec)],
+            cwd=out_dir,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    for line in proc.stdout.splitlines():
+        if line.startswith("RESULT="):
+            return dict(json.loads(line.removeprefix("RESULT=")))
+    raise RuntimeError(f"Scenario {operation}/{size} failed:\n{proc.stderr[-2000:]}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes",
+        default="10,1000,50000",
+        help="Comma-separated device counts (default: 10,1000,50000).",
+    )
+    parser.add_argument("--workers", type=int, default=32, help="Workers (default: 32).")
+    parser.add_argument(
+        "--engine", choices=("thread", "async"), default="thread", help="Engine (default: thread)."
+    )
+    parser.add_argument("--format", default="xlsx", help="Inventory format (default: xlsx).")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Simulated seconds per command (default: 0)."
+    )
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="Share of simulated connections that time out (default: 0).",
+    )
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    print(
+        f"workers={args.workers} engine={args.engine} format={args.format} "
+        f"latency={args.latency}s failure-rate={args.failure_rate}"
+    )
+    print(f"{'operation':<15} {'devices':>8} {'seconds':>9} {'devices/s':>10} {'peak RSS':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        captures = Path(tmp) / "captures"
+        write_captures(captures)
+
+        for operation in OPERATIONS:
+            for size in sizes:
+                result = run_scenario(operation, size, captures, args)
+                rate = size / result["elapsed"] if result["elapsed"] > 0 else 0.0
+                print(
+                    f"{operation:<15} {size:>8} {result['elapsed']:>9.2f} {rate:>10,.0f} "
+                    f"{result['peak_kb'] / 1024:>8.1f}MB"
+                )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+"""
+Local SSH stand-in devices for end-to-end load tests.
+
+'serve' starts lightweight paramiko SSH servers on loopback addresses
+(127.0.0.1, 127.0.0.2, ...) that emulate an IOS prompt, 'enable',
+'show running-config' and 'show inventory'. 'load' starts them in separate
+processes, checks commands.get_hostname() and commands.send_cmd() against one
+of them, then collects from all of them at increasing worker counts to show
+how many concurrent sessions one rackscribe process sustains. 'bulk' serves
+one device with a very large running configuration and compares netmiko's
+send_command() with rackscribe's bulk reader (--bulk-read).
+
+Linux only: other systems route only 127.0.0.1 to the loopback interface.
+
+Usage:
+    python benchmarks/ssh_standin.py serve [--devices 100] [--port 2222] [--latency 0.05]
+    python benchmarks/ssh_standin.py load [--devices 200] [--workers 8,32,128]
+                                          [--latency 0.05] [--server-processes 2]
+    python benchmarks/ssh_standin.py bulk [--config-lines 100000] [--runs 3]
+"""
+
+import argparse
+import functools
+import json
+import logging
+import os
+import resource
+import selectors
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections.abc import Callable
+from pathlib import Path
+from typing import cast
+
+import paramiko
+
+LAST_CHANGE = "! Last configuration change at 10:00:00 UTC Mon Mar 4 2024 by admin"
+
+
+def loopback_address(n: int) -> str:
+    """n-th loopback address, starting at 127.0.0.1."""
+    return f"127.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+
+@functools.cache
+def running_config(hostname: str, config_lines: int = 0) -> str:
+    """An access switch config, padded with interfaces to about config_lines lines."""
+    lines = ["Building configuration...", "", "Current configuration : 4096 bytes", "!"]
+    lines += [LAST_CHANGE, "!", "version 17.9", f"hostname {hostname}", "!"]
+    for port in range(1, max(48, config_lines // 3) + 1):
+        lines += [f"interface GigabitEthernet1/0/{port}", " switchport mode access", "!"]
+    lines.append("end")
+    return "\r\n".join(lines)
+
+
+def inventory(hostname: str) -> str:
+    entries = [
+        'NAME: "Chassis", DESCR: "Cisco Catalyst 9300 48-port PoE+"\r\n'
+        f"PID: C9300-48P         , VID: V02  , SN: FOC{zlib.crc32(hostname.encode()) % 10**8:08d}",
+        'NAME: "Power Supply 1", DESCR: "715W AC Power Supply"\r\n'
+        "PID: PWR-C1-715WAC     , VID: V01  , SN: LIT00000001",
+    ]
+    return "\r\n\r\n".join(entries)
+
+
+# Command -> output for a hostname and running-config size.
+COMMANDS: dict[str, Callable[[str, int], str]] = {
+    "show running-config": running_config,
+    "show inventory": lambda hostname, config_lines: inventory(hostname),
+    "show running-config | include Last configuration change": lambda *_: LAST_CHANGE,
+}
+
+
+class _Server(paramiko.ServerInterface):
+    """Accepts any password and one interactive shell."""
+
+    def __init__(self) -> None:
+        self.shell_ready = threading.Event()
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "password"
+
+    def check_auth_password(self, username: str, password: str) -> int:
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, *args: object) -> bool:
+        return True
+
+    def check_channel_shell_request(self, channel: paramiko.Channel) -> bool:
+        self.shell_ready.set()
+        return True
+
+
+class DeviceShell:
+    """IOS-like CLI over an SSH channel: echo, prompt, enable and a few show commands."""
+
+    def __init__(
+        self, channel: paramiko.Channel, hostname: str, latency: float, config_lines: int = 0
+    ) -> None:
+        self.channel = channel
+        self.hostname = hostname
+        self.latency = latency
+        self.config_lines = config_lines
+        self.privileged = False
+        self.awaiting_password = False
+
+    @property
+    def prompt(self) -> str:
+        return f"{self.hostname}{'#' if self.privileged else '>'}"
+
+    def run(self) -> None:
+        self.channel.sendall(f"\r\n{self.prompt}".encode())
+        line = ""
+        previous = ""
+        while True:
+            data = self.channel.recv(4096)
+            if not data:
+                return
+            for char in data.decode(errors="ignore"):
+                if char == "\n" and previous == "\r":
+                    previous = char
+                    continue
+                previous = char
+                if char in "\r\n":
+                    if not self.handle(line):
+                        return
+                    line = ""
+                else:
+                    line += char
+                    if not self.awaiting_password:
+                        self.channel.sendall(char.encode())
+
+    def handle(self, line: str) -> bool:
+        """Answer one line. Returns False when the session should end."""
+        command = line.strip()
+        self.channel.sendall(b"\r\n")
+
+        if self.awaiting_password:
+            self.awaiting_password = False
+            self.privileged = True
+        elif command in ("exit", "logout"):
+            return False
+        elif command == "enable" and not self.privileged:
+            self.awaiting_password = True
+            self.channel.sendall(b"Password: ")
+            return True
+        elif command in COMMANDS:
+            if self.latency:
+                time.sleep(self.latency)
+            output = COMMANDS[command](self.hostname, self.config_lines)
+            self.channel.sendall(f"{output}\r\n".encode())
+        elif command and not command.startswith(("terminal ", "enable")):
+            self.channel.sendall(b"% Invalid input detected at '^' marker.\r\n")
+
+        self.channel.sendall(self.prompt.encode())
+        return True
+
+
+def handle_connection(
+    sock: socket.socket,
+    address: str,
+    host_key: paramiko.PKey,
+    latency: float,
+    config_lines: int = 0,
+) -> None:
+    transport = paramiko.Transport(sock)
+    transport.add_server_key(host_key)
+    server = _Server()
+    try:
+        transport.start_server(server=server)
+        channel = transport.accept(timeout=30)
+        if channel is None or not server.shell_ready.wait(timeout=30):
+            return
+        hostname = f"sw-{address.replace('.', '-')}"
+        DeviceShell(channel, hostname, latency, config_lines).run()
+    except (paramiko.SSHException, OSError, EOFError):
+        pass
+    finally:
+        transport.close()
+
+
+def raise_file_limit() -> None:
+    """Allow as many open sockets as the hard limit permits."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def serve(devices: int, port: int, latency: float, offset: int = 0, config_lines: int = 0) -> None:
+    """Listen on port of devices loopback addresses, starting after offset, until killed."""
+    raise_file_limit()
+    host_key = paramiko.RSAKey.generate(2048)
+    selector = selectors.DefaultSelector()
+    for n in range(offset + 1, offset + devices + 1):
+        listener = socket.create_server((loopback_address(n), port), backlog=128)
+        listener.setblocking(False)
+        selector.register(listener, selectors.EVENT_READ, loopback_address(n))
+
+    print("READY", flush=True)
+    while True:
+        for key, _ in selector.select():
+            listener = cast(socket.socket, key.fileobj)
+            try:
+                sock, _ = listener.accept()
+            except BlockingIOError:
+                continue
+            sock.setblocking(True)
+            threading.Thread(
+                target=handle_connection,
+                args=(sock, key.data, host_key, latency, config_lines),
+                daemon=True,
+            ).start()
+
+
+def start_servers(args: argparse.Namespace) -> list[subprocess.Popen[str]]:
+    """Start server processes, each serving an equal slice of the loopback addresses."""
+    count = max(1, min(args.server_processes, args.devices))
+    share = -(-args.devices // count)
+    servers = []
+    for index in range(count):
+        devices = min(share, args.devices - index * share)
+        cmd = [
+            sys.executable,
+            __file__,
+            "serve",
+            f"--devices={devices}",
+            f"--offset={index * share}",
+            f"--port={args.port}",
+            f"--latency={args.latency}",
+            f"--config-lines={args.config_lines}",
+        ]
+        servers.append(subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True))
+    for server in servers:
+        if server.stdout is None or server.stdout.readline().strip() != "READY":
+            raise RuntimeError("Stand-in server failed to start.")
+    return servers
+
+
+def load(args: argparse.Namespace) -> int:
+    raise_file_limit()
+    os.environ.update(
+        {
+            "DEVICE_TYPE": "cisco_ios",
+            "DEVICE_USERNAME": "admin",
+            "DEVICE_PASSWORD": "admin",
+            "DEVICE_SECRET": "enable",
+            "DEVICE_PORT": str(args.port),
+        }
+    )
+
+    # Imported after the environment is set up, as an operation would be.
+    from rackscribe.commands import get_hostname, send_cmd
+    from rackscribe.inventory import load_device_attr
+    from rackscribe.operations import gather_collections
+    from rackscribe.options import RunOptions
+    from rackscribe.output import process_inventory_output
+
+    servers = start_servers(args)
+    try:
+        params = load_device_attr(loopback_address(1))
+        hostname = get_hostname(params)
+        rows = process_inventory_output(hostname, send_cmd(params, "show inventory"))
+        print(f"get_hostname/send_cmd: {hostname}, {len(rows)} inventory rows")
+
+        ip_list = [loopback_address(n) for n in range(1, args.devices + 1)]
+        print(
+            f"{'workers':>7} {'devices':>8} {'ok':>6} {'seconds':>8} {'devices/s':>10} "
+            f"{'connect p50':>12} {'connect p99':>12}"
+        )
+        for workers in (int(value) for value in args.workers.split(",")):
+            with tempfile.TemporaryDirectory() as out_dir:
+                report_path = Path(out_dir) / "report.json"
+                options = RunOptions(workers=workers, output_format="csv", report_path=report_path)
+                gather_collections(
+                    ip_list, ["config", "inventory"], "Inventory", Path(out_dir), options=options
+                )
+                report = json.loads(report_path.read_text(encoding="utf-8"))
+
+            summary, connect = report["summary"], report["phases"]["connect"]
+            print(
+                f"{workers:>7} {args.devices:>8} {summary['success_count']:>6} "
+                f"{summary['elapsed']:>8.2f} {summary['devices_per_second']:>10.1f} "
+                f"{connect['p50']:>11.3f}s {connect['p99']:>11.3f}s"
+            )
+    finally:
+        for server in servers:
+            server.terminate()
+    return 0
+
+
+def bulk(args: argparse.Namespace) -> int:
+    os.environ.update({"DEVICE_TYPE": "cisco_ios", "DEVICE_SECRET": "enable"})
+    from rackscribe.commands import device_session
+    from rackscribe.inventory import Device, device_params
+
+    servers = start_servers(args)
+    try:
+        device = Device(loopback_address(1), port=args.port)
+        params = {**device_params(device), "username": "admin", "password": "admin"}
+        readers: dict[str, Callable[..., str]] = {
+            "send_command": lambda session: session.send("show running-config", read_timeout=600),
+            "bulk reader": lambda session: session.send_bulk("show running-config"),
+        }
+        outputs = {}
+        print(f"{'reader':<13} {'lines':>8} {'MB':>6} {'seconds':>8} {'MB/s':>7}")
+        for name, read in readers.items():
+            samples = []
+            for _ in range(args.runs):
+                with device_session(params) as session:
+                    start = time.perf_counter()
+                    outputs[name] = read(session)
+                    samples.append(time.perf_counter() - start)
+            seconds = sorted(samples)[len(samples) // 2]
+            size_mb = len(outputs[name]) / 1_000_000
+            print(
+                f"{name:<13} {outputs[name].count(chr(10)) + 1:>8} {size_mb:>6.1f} "
+                f"{seconds:>8.2f} {size_mb / seconds:>7.1f}"
+            )
+        if len(set(outputs.values())) != 1:
+            print("Readers returned different output.")
+            return 1
+    finally:
+        for server in servers:
+            server.terminate()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run stand-in devices until killed.")
+    load_parser = subparsers.add_parser("load", help="Load-test rackscribe against them.")
+    bulk_parser = subparsers.add_parser("bulk", help="Compare readers on a large config.")
+    for sub in (serve_parser, load_parser):
+        sub.add_argument("--devices", type=int, default=100, help="Devices (default: 100).")
+    for sub in (serve_parser, load_parser, bulk_parser):
+        sub.add_argument("--port", type=int, default=2222, help="SSH port (default: 2222).")
+        sub.add_argument(
+            "--latency",
+            type=float,
+            default=0.0 if sub is bulk_parser else 0.05,
+            help="Seconds each show command takes (default: 0.05, or 0 for bulk).",
+        )
+        sub.add_argument(
+            "--config-lines",
+            type=int,
+            default=100_000 if sub is bulk_parser else 0,
+            help="Approximate running-config lines (default: 150, or 100000 for bulk).",
+        )
+    serve_parser.add_argument("--offset", type=int, default=0, help=argparse.SUPPRESS)
+    bulk_parser.add_argument("--runs", type=int, default=3, help="Runs per reader (default: 3).")
+    bulk_parser.set_defaults(devices=1, server_processes=1)
+    load_parser.add_argument(
+        "--workers", default="8,32,128", help="Comma-separated worker counts (default: 8,32,128)."
+    )
+    load_parser.add_argument(
+        "--server-processes",
+        type=int,
+        default=2,
+        help="Processes serving the stand-in devices (default: 2).",
+    )
+    args = parser.parse_args()
+
+    # Sessions dropped at 'exit' are expected on both ends.
+    logging.getLogger("paramiko").setLevel(logging.CRITICAL)
+
+    if args.mode == "serve":
+        serve(args.devices, args.port, args.latency, args.offset, args.config_lines)
+        return 0
+    if args.mode == "bulk":
+        return bulk(args)
+    return load(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
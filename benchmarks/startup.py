@@ -0,0 +1,96 @@
+"""
+Start-up time benchmark for the rackscribe CLI.
+
+Runs 'python -m rackscribe' for the commands that must stay fast and fails
+(exit code 1) when the median wall-clock time exceeds the budget or when a
+heavy dependency is imported before an operation runs.
+
+Usage:
+    python benchmarks/startup.py [--runs 7] [--budget 0.5]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Modules that must only be imported once an operation actually runs.
+HEAVY_MODULES = ("netmiko", "paramiko", "cryptography", "textfsm", "openpyxl", "pandas")
+
+COMMANDS = (["--help"], ["--version"], ["--auto-setup"])
+
+_PROBE = """
+import json, runpy, sys
+command, heavy = json.loads(sys.argv[1]), json.loads(sys.argv[2])
+sys.argv = ["rackscribe", *command]
+try:
+    runpy.run_module("rackscribe", run_name="__main__")
+except SystemExit:
+    pass
+print("HEAVY=" + json.dumps(sorted(m for m in heavy if m in sys.modules)), file=sys.stderr)
+"""
+
+
+def time_command(args: list[str], runs: int, cwd: str) -> float:
+    """Median wall-clock seconds of 'python -m rackscribe <args>'."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "rackscribe", *args], cwd=cwd, capture_output=True, check=False
+        )
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def heavy_imports(args: list[str], cwd: str) -> list[str]:
+    """Heavy modules present in sys.modules after running the command."""
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE, json.dumps(args), json.dumps(HEAVY_MODULES)],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    for line in proc.stderr.splitlines():
+        if line.startswith("HEAVY="):
+            return list(json.loads(line.removeprefix("HEAVY=")))
+    raise RuntimeError(f"Could not probe 'rackscribe {' '.join(args)}':\n{proc.stderr}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=7, help="Runs per command (default: 7).")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=0.5,
+        help="Maximum median seconds per command (default: 0.5).",
+    )
+    args = parser.parse_args()
+
+    failed = False
+    # --auto-setup writes sample files, so every command runs in a scratch folder.
+    with tempfile.TemporaryDirectory() as cwd:
+        for command in COMMANDS:
+            median = time_command(command, args.runs, cwd)
+            heavy = heavy_imports(command, cwd)
+
+            status = "ok"
+            if median > args.budget:
+                status = f"SLOW (budget {args.budget:.3f}s)"
+                failed = True
+            if heavy:
+                status = f"HEAVY IMPORTS: {', '.join(heavy)}"
+                failed = True
+
+            print(f"rackscribe {' '.join(command):<14} median {median:.3f}s  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
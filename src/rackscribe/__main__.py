@@ -1,4 +1,5 @@
 import argparse
+import contextlib
 import logging
 import os
 from importlib.metadata import version
@@ -7,10 +8,58 @@ from pathlib import Path
 from dotenv import load_dotenv
 
 from .auto_setup import auto_setup
-from .inventory import load_inventory
-from .logging_setup import setup_logging
-from .operations import gather_running_configs, gather_serial_numbers
+from .config_store import COMPRESSIONS, missing_compressor
+from .inventory import load_devices, required_env_vars
+from .logging_setup import LOG_FORMATS, setup_logging
+from .options import COLLECTIONS, ENGINES, RunOptions
+from .report import REPORT_FORMATS
 from .sanitize import validate_output_path
+from .scheduling import parse_limits
+from .sharding import parse_shard
+from .writers import WRITERS, missing_requirement
+
+
+def parse_collect(value: str) -> list[str]:
+    """Parse a comma-separated --collect value into COLLECTIONS keys."""
+    names = [name.strip().lower() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in COLLECTIONS]
+    if not names or unknown:
+        raise argparse.ArgumentTypeError(
+            f"invalid collection '{value}'. Choose from: {', '.join(COLLECTIONS)}."
+        )
+    return names
+
+
+def parse_shard_arg(value: str) -> tuple[int, int]:
+    try:
+        return parse_shard(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from None
+
+
+def parse_limits_arg(value: str) -> dict[str, int]:
+    try:
+        return parse_limits(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from None
+
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(value: str) -> float:
+    """Parse a duration such as '90', '45m', '12h' or '7d' into seconds."""
+    text = value.strip().lower()
+    scale = _DURATION_UNITS.get(text[-1:])
+    try:
+        seconds = float(text[:-1] if scale else text) * (scale or 1)
+    except ValueError:
+        seconds = -1.0
+    if not seconds >= 0:  # also rejects nan
+        raise argparse.ArgumentTypeError(
+            f"invalid duration '{value}'. Use seconds or a number with s, m, h or d, e.g. 12h."
+        )
+    return seconds
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -32,6 +81,26 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Collect serial numbers.",
     )
+    group.add_argument(
+        "-a",
+        "--all",
+        action="store_true",
+        help="Collect running configurations and serial numbers in a single pass.",
+    )
+    group.add_argument(
+        "--collect",
+        type=parse_collect,
+        action="append",
+        help=(
+            "Comma-separated collections to run in a single pass, can be repeated "
+            f"(choices: {', '.join(COLLECTIONS)})."
+        ),
+    )
+    group.add_argument(
+        "--merge",
+        action="store_true",
+        help="Merge per-shard results in the output folder into one inventory workbook.",
+    )
     group.add_argument(
         "--auto-setup",
         action="store_true",
@@ -46,6 +115,23 @@ def build_parser() -> argparse.ArgumentParser:
         choices=range(5),
         help="Logging level: 0-Critical, 1-Error, 2-Warning, 3-Info (default), 4-Debug",
     )
+    parser.add_argument(
+        "--log-format",
+        choices=LOG_FORMATS,
+        default="text",
+        help=(
+            "rackscribe.log format: text (default) or json, one JSON object per line with "
+            "host, phase and duration fields where they apply."
+        ),
+    )
+    parser.add_argument(
+        "--log-queue",
+        action="store_true",
+        help=(
+            "Hand log records to a background writer instead of writing them from the "
+            "collecting threads. Useful with many workers."
+        ),
+    )
     parser.add_argument(
         "-i",
         "--inventory",
@@ -65,13 +151,245 @@ def build_parser() -> argparse.ArgumentParser:
         "--out-file",
         type=str,
         default="Inventory",
-        help="Base output file name for inventory Excel export (default: Inventory).",
+        help="Base output file name for inventory export (default: Inventory).",
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(WRITERS),
+        default="xlsx",
+        help="Inventory output format (default: xlsx). parquet requires pyarrow.",
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help=(
+            "Compare changed configurations with their previous copies, section by "
+            "section, and write a Config-changes report."
+        ),
+    )
+    parser.add_argument(
+        "--compress",
+        choices=list(COMPRESSIONS),
+        default="none",
+        help=(
+            "Store running configurations compressed, each distinct configuration once "
+            "(default: none). zstd requires zstandard."
+        ),
+    )
+    parser.add_argument(
+        "--bulk-read",
+        action="store_true",
+        help=(
+            "Use a reader tuned for very large command output, e.g. 100k-line "
+            "configurations, instead of netmiko's default read loop."
+        ),
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of devices to collect from concurrently (default: 1).",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="thread",
+        help="Concurrency engine: thread pool (default) or asyncio.",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Per-device timeout in seconds, async engine only (default: no timeout).",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Number of local processes to split the inventory across (default: 1).",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard_arg,
+        default=None,
+        metavar="K/N",
+        help="Only collect shard K of N of the inventory and save results for --merge.",
+    )
+    parser.add_argument(
+        "--probe",
+        action="store_true",
+        help=(
+            "Check each device's last configuration change first and skip pulling "
+            "configurations that have not changed since the previous run."
+        ),
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rewrite every configuration file, even when unchanged since the previous run.",
+    )
+    parser.add_argument(
+        "--limit",
+        type=parse_limits_arg,
+        action="append",
+        metavar="NAME=N",
+        help=(
+            "Comma-separated caps on concurrent sessions per concurrency group or device "
+            "type, can be repeated, e.g. --limit site-a=20,cisco_asa=2."
+        ),
+    )
+    parser.add_argument(
+        "--connect-rate",
+        type=float,
+        default=0.0,
+        metavar="N",
+        help="Open at most N new connections per second (default: 0, unlimited).",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        help="Retry a device up to N times after a timeout or dropped session (default: 0).",
+    )
+    parser.add_argument(
+        "--retry-delay",
+        type=float,
+        default=1.0,
+        metavar="SECONDS",
+        help=(
+            "Delay before the first retry, doubled for each further retry with random "
+            "jitter (default: 1.0)."
+        ),
+    )
+    parser.add_argument(
+        "--preflight",
+        action="store_true",
+        help="Check the SSH port is open before connecting, so unreachable hosts fail fast.",
+    )
+    parser.add_argument(
+        "--discover",
+        action="store_true",
+        help=(
+            "Sweep the SSH port of every device concurrently before collecting and skip "
+            "addresses that do not answer, e.g. for inventories of whole subnets."
+        ),
+    )
+    parser.add_argument(
+        "--max-failures",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Skip the remaining devices after N consecutive failures (default: 0, never).",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=parse_duration,
+        default=None,
+        metavar="DURATION",
+        help=(
+            "Serve inventory results at most DURATION old (e.g. 12h, 7d) from the result cache "
+            "in the output folder and collect only the rest. To spread refreshes out, each "
+            "device's entry expires at its own point between DURATION/2 and DURATION. "
+            "0 refreshes every device."
+        ),
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Only collect from devices that failed in the previous run in the output folder.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Resume an interrupted run: skip devices it already collected and rebuild "
+            "the output from its journal."
+        ),
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help=(
+            "Keep running with warm device sessions and a local HTTP API. Collections "
+            "selected with -r/-s/-a/--collect are repeated every --interval seconds."
+        ),
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help="Seconds between scheduled collections in daemon mode (default: 0, API only).",
+    )
+    parser.add_argument(
+        "--listen",
+        type=str,
+        default="127.0.0.1:8750",
+        metavar="HOST:PORT",
+        help="Daemon API address (default: 127.0.0.1:8750).",
+    )
+    parser.add_argument(
+        "--session-idle",
+        type=float,
+        default=300.0,
+        metavar="SECONDS",
+        help="Close daemon sessions left idle this long (default: 300).",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help=(
+            "Write Prometheus metrics at the end of each run, e.g. into node_exporter's "
+            "textfile collector folder (a .prom file)."
+        ),
+    )
+    parser.add_argument(
+        "--metrics-listen",
+        type=str,
+        default=None,
+        metavar="HOST:PORT",
+        help=(
+            "Serve live Prometheus metrics at http://HOST:PORT/metrics while running. "
+            "In daemon mode, metrics are served by the API at /metrics."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Profile the run with cProfile, save the profile to the output folder and "
+            "show the top hot spots."
+        ),
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="With --profile, also trace peak memory per run phase (slower).",
     )
     parser.add_argument(
         "--stats",
         action="store_true",
         help="Show elapsed time and operation statistics at the end of operation.",
     )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help=(
+            "Write a run report with per-device phase timings, percentiles and the "
+            "slowest devices (.json, or .csv for one row per device)."
+        ),
+    )
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        default=10,
+        help="Number of slowest devices listed by --report and --stats (default: 10).",
+    )
     parser.add_argument(
         "-V",
         "--version",
@@ -86,10 +404,68 @@ def main() -> None:
     parser = build_parser()
     args = parser.parse_args()
 
+    if args.workers < 1:
+        parser.error("--workers must be 1 or greater.")
+    if args.processes < 1:
+        parser.error("--processes must be 1 or greater.")
+    if args.timeout is not None and args.timeout <= 0:
+        parser.error("--timeout must be greater than 0.")
+    if args.timeout is not None and args.engine != "async":
+        parser.error("--timeout requires --engine async.")
+    too_low = [
+        f"{name}={n}"
+        for limits in args.limit or []
+        for name, n in limits.items()
+        if n < args.processes
+    ]
+    if too_low:
+        parser.error(
+            f"--limit {', '.join(too_low)} is lower than --processes {args.processes}. Each "
+            "process gets an equal share of a limit, so limits must be at least --processes."
+        )
+    if args.connect_rate < 0:
+        parser.error("--connect-rate must be 0 or greater.")
+    if args.retries < 0:
+        parser.error("--retries must be 0 or greater.")
+    if args.retry_delay < 0:
+        parser.error("--retry-delay must be 0 or greater.")
+    if args.max_failures < 0:
+        parser.error("--max-failures must be 0 or greater.")
+    if args.report and Path(args.report).suffix.lower() not in REPORT_FORMATS:
+        parser.error(f"--report must end in one of: {', '.join(REPORT_FORMATS)}.")
+    if args.daemon and (args.processes > 1 or args.shard or args.resume or args.retry_failed):
+        parser.error(
+            "--daemon cannot be combined with --processes, --shard, --resume or --retry-failed."
+        )
+    if args.daemon and (args.merge or args.auto_setup):
+        parser.error("--daemon cannot be combined with --merge or --auto-setup.")
+    if args.profile_memory and not args.profile:
+        parser.error("--profile-memory requires --profile.")
+    if args.daemon and args.profile:
+        parser.error("--profile cannot be combined with --daemon.")
+    if args.daemon and args.metrics_listen:
+        parser.error(
+            "In daemon mode, metrics are served by the API at /metrics. Drop --metrics-listen."
+        )
+    if args.interval < 0:
+        parser.error("--interval must be 0 or greater.")
+    if args.session_idle <= 0:
+        parser.error("--session-idle must be greater than 0.")
+    if args.slowest < 0:
+        parser.error("--slowest must be 0 or greater.")
+    package = missing_requirement(args.format)
+    if package:
+        parser.error(f"--format {args.format} requires '{package}'. Install it with pip.")
+    package = missing_compressor(args.compress)
+    if package:
+        parser.error(f"--compress {args.compress} requires '{package}'. Install it with pip.")
+
     load_dotenv()
 
     logging_levels = ["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"]
-    setup_logging(level=logging_levels[args.log_level])
+    setup_logging(
+        level=logging_levels[args.log_level], log_format=args.log_format, queued=args.log_queue
+    )
     log = logging.getLogger("rackscribe")
 
     # Auto-setup mode ----
@@ -103,6 +479,56 @@ def main() -> None:
             log.error("Auto-setup encountered errors. Check rackscribe.log for details.")
         return
 
+    # Operations pull in netmiko and openpyxl, so they are imported only once
+    # an operation is about to run. This keeps --help, --version and
+    # --auto-setup fast.
+    from .operations import (
+        gather_collections,
+        gather_running_configs,
+        gather_serial_numbers,
+        merge_shards,
+    )
+
+    options = RunOptions(
+        workers=args.workers,
+        engine=args.engine,
+        timeout=args.timeout,
+        processes=args.processes,
+        shard=args.shard,
+        probe=args.probe,
+        full=args.full,
+        group_limits={name: n for limits in args.limit or [] for name, n in limits.items()},
+        connect_rate=args.connect_rate,
+        retries=args.retries,
+        retry_delay=args.retry_delay,
+        preflight=args.preflight,
+        discover=args.discover,
+        max_failures=args.max_failures,
+        retry_failed=args.retry_failed,
+        max_age=args.max_age,
+        resume=args.resume,
+        diff=args.diff,
+        bulk_read=args.bulk_read,
+        compression=args.compress,
+        output_format=args.format,
+        report_path=Path(args.report) if args.report else None,
+        report_slowest=args.slowest,
+        metrics_file=Path(args.metrics_file) if args.metrics_file else None,
+        log_level=logging_levels[args.log_level],
+        log_format=args.log_format,
+        log_queue=args.log_queue,
+    )
+
+    # Merge mode ----
+    if args.merge:
+        try:
+            out_dir = validate_output_path(args.out_dir)
+        except ValueError as exc:
+            log.error(str(exc))
+            return
+        merge_shards(args.out_file, out_dir, show_stats=args.stats, options=options)
+        return
+
     # Normal operations ----
 
     # Check .env exists
@@ -115,14 +541,20 @@ def main() -> None:
         )
         return
 
-    # Check .env variables
-    required_vars = [
-        "DEVICE_TYPE",
-        "DEVICE_USERNAME",
-        "DEVICE_PASSWORD",
-    ]
+    try:
+        out_dir = validate_output_path(args.out_dir)
+    except ValueError as exc:
+        log.error(str(exc))
+        return
+
+    devices = load_devices(args.inventory)
+
+    if not devices:
+        log.error(f"Error loading IP address list. Check '{args.inventory}'.")
+        return
 
-    missing = [var for var in required_vars if not os.getenv(var)]
+    # Check .env variables, including any per-group credentials the inventory refers to.
+    missing = [var for var in required_env_vars(devices) if not os.getenv(var)]
 
     if missing:
         log.error(
@@ -132,34 +564,94 @@ def main() -> None:
         )
         return
 
-    try:
-        out_dir = validate_output_path(args.out_dir)
-    except ValueError as exc:
-        log.error(str(exc))
-        return
+    log.info(f"Loaded {len(devices)} device(s).")
 
-    ip_list = load_inventory(args.inventory)
+    collect: list[str] = []
+    if args.all:
+        collect = list(COLLECTIONS)
+    elif args.collect:
+        # Flatten repeated --collect options, keeping first-seen order.
+        collect = list(dict.fromkeys(name for names in args.collect for name in names))
 
-    if not ip_list:
-        log.error(f"Error loading IP address list. Check '{args.inventory}'.")
-        return
+    # Daemon mode ----
+    if args.daemon:
+        from .daemon import Daemon, DaemonConfig, parse_listen
+        from .session_pool import SessionPool
 
-    log.info(f"Loaded {len(ip_list)} device(s).")
+        try:
+            host, port = parse_listen(args.listen)
+        except ValueError as exc:
+            log.error(str(exc))
+            return
 
-    if args.running_config:
-        gather_running_configs(ip_list, out_dir=out_dir, show_stats=args.stats)
-    elif args.serial_numbers:
-        gather_serial_numbers(
-            ip_list=ip_list,
-            out_file=args.out_file,
+        if args.running_config:
+            collect = ["config"]
+        elif args.serial_numbers:
+            collect = ["inventory"]
+        if collect and not args.interval:
+            log.warning("No --interval given. Collections only run when requested through the API.")
+            collect = []
+
+        config = DaemonConfig(
+            inventory=args.inventory,
             out_dir=out_dir,
+            out_file=args.out_file,
+            options=options,
+            collect=collect,
+            interval=args.interval,
             show_stats=args.stats,
         )
-    else:
-        log.error(
-            "No operation selected. Please select an operation. "
-            "Use 'rackscribe --help' to display options.",
-        )
+        Daemon(config, SessionPool(idle_timeout=args.session_idle)).serve(host, port)
+        return
+
+    if args.metrics_listen:
+        from .daemon import parse_listen
+        from .metrics import serve_metrics
+
+        try:
+            serve_metrics(*parse_listen(args.metrics_listen))
+        except (ValueError, OSError) as exc:
+            log.error(f"Cannot serve metrics at '{args.metrics_listen}': {exc}")
+            return
+
+    profiler: contextlib.AbstractContextManager[None] = contextlib.nullcontext()
+    if args.profile:
+        from .profiling import profile_run
+
+        if args.processes > 1:
+            log.warning("--profile only profiles the main process, not the worker processes.")
+        profiler = profile_run(out_dir, memory=args.profile_memory)
+
+    with profiler:
+        if collect:
+            gather_collections(
+                devices,
+                collect,
+                out_file=args.out_file,
+                out_dir=out_dir,
+                show_stats=args.stats,
+                options=options,
+            )
+        elif args.running_config:
+            gather_running_configs(
+                devices,
+                out_dir=out_dir,
+                show_stats=args.stats,
+                options=options,
+            )
+        elif args.serial_numbers:
+            gather_serial_numbers(
+                ip_list=devices,
+                out_file=args.out_file,
+                out_dir=out_dir,
+                show_stats=args.stats,
+                options=options,
+            )
+        else:
+            log.error(
+                "No operation selected. Please select an operation. "
+                "Use 'rackscribe --help' to display options.",
+            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,191 @@
+import asyncio
+import contextlib
+import functools
+import logging
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from .inventory import NumberedDevices
+from .scheduling import DeviceQueue, GroupLimits
+from .stats import DeviceResult
+
+log = logging.getLogger("rackscribe")
+
+# Deadline of the device running on the current thread, set by the async engine.
+_current = threading.local()
+
+
+class _Deadline:
+    """
+    Settles, once, whether a device finished in time or was abandoned at its timeout.
+
+    The engine expires the device when its timeout fires, and the device's thread
+    claims its result before writing anything. Whichever comes first wins.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._state: str | None = None
+
+    def claim(self) -> bool:
+        with self._lock:
+            self._state = self._state or "claimed"
+            return self._state == "claimed"
+
+    def expire(self) -> bool:
+        with self._lock:
+            self._state = self._state or "expired"
+            return self._state == "expired"
+
+
+def claim_result() -> bool:
+    """
+    Whether the device on this thread may still write and record its result.
+
+    False once the async engine has timed the device out: its result is then
+    dropped, so nothing is written for it. Always True outside the async engine.
+    """
+    deadline: _Deadline | None = getattr(_current, "deadline", None)
+    return deadline is None or deadline.claim()
+
+
+def run_devices_async(
+    devices: NumberedDevices,
+    task: Callable[[int, str], DeviceResult],
+    workers: int = 1,
+    timeout: float | None = None,
+    on_result: Callable[[DeviceResult], None] | None = None,
+    limits: GroupLimits | None = None,
+) -> list[DeviceResult]:
+    """
+    Asyncio counterpart of operations.run_devices().
+
+    A global semaphore caps in-flight devices at workers, timed-out devices
+    whose session is still open included. Tasks are only created once a slot
+    is free, so memory stays flat for very large inventories. Devices start
+    in the order given, except that a device at its group or platform cap
+    (limits) waits while other devices go ahead. Each device is bounded by
+    timeout seconds from when its thread starts; timed-out devices are
+    recorded as failures and the rest of the run carries on (see
+    claim_result()). on_result is called from the event loop thread as each
+    device finishes.
+    """
+    return asyncio.run(_drive(devices, task, workers, timeout, on_result, limits))
+
+
+def _start_thread(
+    loop: asyncio.AbstractEventLoop,
+    deadline: _Deadline,
+    task: Callable[[int, str], DeviceResult],
+    device_number: int,
+    ip: str,
+) -> tuple[asyncio.Future[None], asyncio.Future[DeviceResult]]:
+    """Run task on a thread of its own. Returns futures for its start and its result."""
+    started: asyncio.Future[None] = loop.create_future()
+    done: asyncio.Future[DeviceResult] = loop.create_future()
+
+    def settle(future: asyncio.Future[Any], value: Any, exc: BaseException | None) -> None:
+        if future.done():
+            return
+        if exc is None:
+            future.set_result(value)
+        else:
+            future.set_exception(exc)
+
+    def notify(future: asyncio.Future[Any], value: Any, exc: BaseException | None = None) -> None:
+        # The loop is gone when an abandoned device returns after the run.
+        with contextlib.suppress(RuntimeError):
+            loop.call_soon_threadsafe(settle, future, value, exc)
+
+    def run() -> None:
+        _current.deadline = deadline
+        notify(started, None)
+        try:
+            result = task(device_number, ip)
+        except BaseException as exc:  # noqa: BLE001
+            notify(done, None, exc)
+        else:
+            notify(done, result)
+
+    threading.Thread(target=run, name=f"rackscribe-async-{device_number}", daemon=True).start()
+    return started, done
+
+
+async def _drive(
+    devices: NumberedDevices,
+    task: Callable[[int, str], DeviceResult],
+    workers: int,
+    timeout: float | None,
+    on_result: Callable[[DeviceResult], None] | None,
+    limits: GroupLimits | None,
+) -> list[DeviceResult]:
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(workers)
+    queue = DeviceQueue(devices, limits)
+    # Set whenever a device's thread returns, freeing its worker and cap slots.
+    finished = asyncio.Event()
+    results: dict[int, DeviceResult] = {}
+    pending: dict[asyncio.Task[None], _Deadline] = {}
+
+    def release_slots(_: asyncio.Future[DeviceResult], ip: str) -> None:
+        queue.release(ip)
+        semaphore.release()
+        finished.set()
+
+    async def run_one(device_number: int, ip: str, deadline: _Deadline) -> None:
+        # Netmiko is blocking, so each session runs on a thread. A thread
+        # abandoned at its timeout keeps running until netmiko's own timeout
+        # fires. Its session stays open meanwhile, so its worker slot and its
+        # group and platform cap slots are only freed once the thread returns.
+        started, done = _start_thread(loop, deadline, task, device_number, ip)
+        done.add_done_callback(functools.partial(release_slots, ip=ip))
+        await started
+        try:
+            result = await asyncio.wait_for(asyncio.shield(done), timeout)
+        except TimeoutError:
+            if deadline.expire():
+                log.warning(
+                    "Timed out after %s seconds collecting from %s.",
+                    timeout,
+                    ip,
+                    extra={"host": ip, "duration": timeout},
+                )
+                result = DeviceResult(device_number, ip, seconds=timeout or 0.0)
+            else:
+                # The device claimed its result just in time and is writing it.
+                result = await done
+
+        if on_result:
+            on_result(result)
+        results[device_number] = result
+
+    def release(done: asyncio.Task[None]) -> None:
+        pending.pop(done, None)
+
+    try:
+        while queue:
+            await semaphore.acquire()
+            while (device := queue.pop_ready()) is None:
+                finished.clear()
+                await finished.wait()
+            deadline = _Deadline()
+            device_task = asyncio.create_task(run_one(*device, deadline))
+            pending[device_task] = deadline
+            device_task.add_done_callback(release)
+
+        if pending:
+            await asyncio.gather(*pending)
+
+    except asyncio.CancelledError:
+        log.warning(f"Collection cancelled. Abandoning {len(pending)} in-flight device(s).")
+        # Devices still running drop their results rather than write them.
+        for device_task, deadline in pending.items():
+            deadline.expire()
+            device_task.cancel()
+        raise
+
+    return [
+        results.get(device_number) or DeviceResult(device_number, ip)
+        for device_number, ip in sorted(devices)
+    ]
@@ -1,7 +1,14 @@
-from collections.abc import Mapping
-from typing import Any, cast
+import re
+import time
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, cast
 
 from .connection import net_connection
+from .stats import timed_phase
+
+if TYPE_CHECKING:
+    from .session_pool import SessionPool
 
 
 # Send one command
@@ -26,13 +33,129 @@ def send_cmd_batch(
     output: dict[str, str] = {}
     with net_connection(params) as conn:
         for i, cmd in enumerate(commands, start=1):
-            output[str(i)] = conn.send_command(cmd, **kwargs)
+            output[str(i)] = cast(str, conn.send_command(cmd, **kwargs))
 
     return output
 
 
+# Seconds without any new data before a bulk read gives up.
+BULK_IDLE_TIMEOUT = 30.0
+
+# Poll delay of a bulk read: reset to the minimum whenever data arrives,
+# doubled up to the maximum while the device is quiet.
+_BULK_MIN_DELAY = 0.002
+_BULK_MAX_DELAY = 0.1
+
+# Characters at the end of the output checked for the prompt or a pager prompt.
+_BULK_TAIL = 256
+
+# Pager prompts, answered with a space when paging could not be disabled.
+_PAGER_RE = re.compile(r"(?:--More--|<--- More --->|-- More --)[ \t]*$")
+# A pager prompt left in the output, with the backspaces or spaces that erased it.
+_PAGER_TEXT_RE = re.compile(r" ?(?:--More--|<--- More --->|-- More --) ?(?:\x08+ *\x08*)?")
+
+
+def read_bulk(
+    conn: Any,
+    command: str,
+    prompt: str,
+    idle_timeout: float = BULK_IDLE_TIMEOUT,
+) -> str:
+    """
+    Send a command with very large output, e.g. a 100k-line running configuration.
+
+    Unlike netmiko's send_command(), chunks are collected in a list and only
+    the tail is checked for the prompt, so reading stays linear in the output
+    size. The read gives up after idle_timeout seconds without new data rather
+    than a fixed total time, so slow, long transfers still complete. Returns the
+    output after the command echo, without the trailing prompt.
+    """
+    from netmiko import ReadTimeout
+
+    echo = command.strip()
+    conn.write_channel(conn.normalize_cmd(command))
+    # Data up to the end of the command echo. Anything before the echo is left
+    # over from earlier commands, e.g. a prompt, and is dropped.
+    head: str | None = ""
+    chunks: list[str] = []
+    tail = ""
+    delay = _BULK_MIN_DELAY
+    last_data = time.monotonic()
+
+    while True:
+        data = conn.read_channel()
+        if data:
+            last_data = time.monotonic()
+            delay = _BULK_MIN_DELAY
+            if head is not None:
+                head += data
+                start = head.find(echo)
+                if start < 0 or "\n" not in head[start:]:
+                    continue
+                data, head = head[head.index("\n", start) + 1 :], None
+
+            chunks.append(data)
+            tail = (tail + data)[-_BULK_TAIL:]
+            if f"\n{tail}".rstrip(" ").endswith(f"\n{prompt}"):
+                break
+            if _PAGER_RE.search(tail):
+                conn.write_channel(" ")
+                tail = ""
+            continue
+
+        if time.monotonic() - last_data > idle_timeout:
+            raise ReadTimeout(f"No output for {idle_timeout} seconds after '{command}'.")
+        time.sleep(delay)
+        delay = min(delay * 2, _BULK_MAX_DELAY)
+
+    output = "".join(chunks)
+    if "More" in output:
+        output = _PAGER_TEXT_RE.sub("", output)
+    return output.rstrip(" ").removesuffix(prompt).rstrip("\n")
+
+
+class DeviceSession:
+    """An open device session: the hostname plus commands sent over one connection."""
+
+    def __init__(self, conn: Any, phases: dict[str, float] | None = None) -> None:
+        self.conn = conn
+        self.phases = phases
+        with timed_phase(phases, "prompt"):
+            self.prompt = conn.find_prompt()
+            self.hostname = _hostname_from_prompt(self.prompt)
+
+    def send(self, command: str, **kwargs: Any) -> str:
+        with timed_phase(self.phases, "command"):
+            return cast(str, self.conn.send_command(command, **kwargs))
+
+    def send_bulk(self, command: str, idle_timeout: float = BULK_IDLE_TIMEOUT) -> str:
+        """Send a command with very large output (see read_bulk())."""
+        with timed_phase(self.phases, "command"):
+            return read_bulk(self.conn, command, self.prompt, idle_timeout)
+
+
+@contextmanager
+def device_session(
+    params: Mapping[str, Any],
+    phases: dict[str, float] | None = None,
+    pool: "SessionPool | None" = None,
+) -> Iterator[DeviceSession]:
+    """
+    Open one session for several commands whose choice may depend on earlier output.
+
+    When phases is given, time spent connecting, entering enable mode, reading
+    the prompt and running commands is added to it. With a pool, a warm session
+    to the host is reused and left open.
+    """
+    with net_connection(params, phases=phases, pool=pool) as conn:
+        yield DeviceSession(conn, phases)
+
+
 def get_hostname(params: Mapping[str, Any]) -> str:
     with net_connection(params) as conn:
-        prompt = conn.find_prompt()
-        hostname = prompt[:-1]
-        return cast(str, hostname)
+        return _hostname_from_prompt(conn.find_prompt())
+
+
+def _hostname_from_prompt(prompt: str) -> str:
+    """Strip the trailing prompt character ('#' or '>')."""
+    return prompt[:-1]
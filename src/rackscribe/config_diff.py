@@ -0,0 +1,182 @@
+import contextlib
+import difflib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+from .config_index import stable_config
+from .config_store import read_config
+from .stats import DeviceResult
+
+log = logging.getLogger("rackscribe")
+
+# Previous copies of changed configs, kept until the diff stage has compared them.
+PREVIOUS_DIR_NAME = ".rackscribe-previous"
+
+# Below this many changed configs, diffing in worker processes costs more than it saves.
+_MIN_PARALLEL_DIFFS = 16
+
+# Nested config sections in config order: (line, child sections) pairs.
+Sections = list[tuple[str, "Sections"]]
+
+
+class ConfigChange(NamedTuple):
+    """Diff of one device's configuration against its previous copy."""
+
+    device_number: int
+    ip: str
+    hostname: str
+    added: int
+    removed: int
+    lines: list[str]
+
+
+def parse_sections(config: str) -> Sections:
+    """
+    Parse an IOS-style configuration into nested sections by indentation.
+
+    Each line is a child of the closest preceding line with less indentation.
+    Lines keep their order and duplicates, since the order of ACL, route-map
+    and prefix-list entries matters. '!' separators, blank lines and volatile
+    lines (see config_index) are left out.
+    """
+    root: Sections = []
+    # (indent, section) from the top level down to the current section.
+    stack: list[tuple[int, Sections]] = [(-1, root)]
+    for raw in stable_config(config).splitlines():
+        line = raw.rstrip()
+        text = line.lstrip()
+        if not text or text.startswith("!"):
+            continue
+        indent = len(line) - len(text)
+        while stack[-1][0] >= indent:
+            stack.pop()
+        children: Sections = []
+        stack[-1][1].append((text, children))
+        stack.append((indent, children))
+    return root
+
+
+def _section_lines(sections: Sections, marker: str, depth: int) -> list[str]:
+    lines = []
+    for text, children in sections:
+        lines.append(f"{marker} {'  ' * depth}{text}")
+        lines += _section_lines(children, marker, depth + 1)
+    return lines
+
+
+def diff_sections(old: Sections, new: Sections, depth: int = 0) -> list[str]:
+    """
+    Compare two parsed configurations section by section.
+
+    The lines of each section are matched with difflib, so reordered lines
+    show up as removed and added again. Removed lines are marked '-', added
+    lines '+', and unchanged parents of a change are shown unmarked for context.
+    """
+    lines = []
+    matcher = difflib.SequenceMatcher(
+        None, [text for text, _ in old], [text for text, _ in new], autojunk=False
+    )
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            for (text, old_children), (_, new_children) in zip(
+                old[old_start:old_end], new[new_start:new_end], strict=True
+            ):
+                nested = diff_sections(old_children, new_children, depth + 1)
+                if nested:
+                    lines.append(f"  {'  ' * depth}{text}")
+                    lines += nested
+        else:
+            lines += _section_lines(old[old_start:old_end], "-", depth)
+            lines += _section_lines(new[new_start:new_end], "+", depth)
+    return lines
+
+
+def _diff_device(item: tuple[int, str, str, Path, Path]) -> ConfigChange | None:
+    """Diff one device's previous and current config files. Runs in worker processes."""
+    device_number, ip, hostname, previous_path, current_path = item
+    try:
+        previous = parse_sections(read_config(previous_path))
+        current = parse_sections(read_config(current_path))
+    except (OSError, ValueError) as exc:
+        log.debug("Failed to diff configuration of %s: %s", ip, exc, exc_info=True)
+        return None
+
+    lines = diff_sections(previous, current)
+    return ConfigChange(
+        device_number,
+        ip,
+        hostname,
+        added=sum(1 for line in lines if line.startswith("+")),
+        removed=sum(1 for line in lines if line.startswith("-")),
+        lines=lines,
+    )
+
+
+def diff_changed_configs(
+    out_dir: Path,
+    results: list[DeviceResult],
+    processes: int | None = None,
+) -> list[ConfigChange]:
+    """
+    Diff every config that changed in this run against its previous copy.
+
+    Only results with a previous copy (configs whose hash changed) are read.
+    Diffs run across processes (default: one per CPU) once there are enough of
+    them. Previous copies are removed afterwards.
+    """
+    items = [
+        (
+            result.device_number,
+            result.ip,
+            result.hostname,
+            out_dir / result.previous_config,
+            out_dir / result.config_entry["file"],
+        )
+        for result in results
+        if result.previous_config and result.config_entry
+    ]
+    if not items:
+        return []
+
+    processes = processes or os.cpu_count() or 1
+    if processes > 1 and len(items) >= _MIN_PARALLEL_DIFFS:
+        chunksize = max(1, len(items) // (processes * 4))
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            diffs = list(pool.map(_diff_device, items, chunksize=chunksize))
+    else:
+        diffs = [_diff_device(item) for item in items]
+
+    failed = sum(1 for diff in diffs if diff is None)
+    if failed:
+        log.warning(f"Could not diff {failed} configuration(s). See rackscribe.log for details.")
+
+    for item in items:
+        item[3].unlink(missing_ok=True)
+    with contextlib.suppress(OSError):
+        (out_dir / PREVIOUS_DIR_NAME).rmdir()
+    return [diff for diff in diffs if diff is not None and diff.lines]
+
+
+def write_change_report(out_dir: Path, changes: list[ConfigChange]) -> Path | None:
+    """Write a compact text report of the config changes. Returns its path, or None on failure."""
+    path = out_dir / f"Config-changes_{datetime.now():%Y%m%d-%H%M%S}.txt"
+    try:
+        with path.open("w", encoding="utf-8") as f:
+            for change in sorted(changes, key=lambda change: change.device_number):
+                f.write(
+                    f"== {change.device_number}. {change.hostname} ({change.ip}): "
+                    f"+{change.added} -{change.removed}\n"
+                )
+                f.write("\n".join(change.lines))
+                f.write("\n\n")
+    except OSError as exc:
+        log.error(
+            f"Failed to write config change report at '{path}'. See rackscribe.log for details."
+        )
+        log.debug(f"Failed to write config change report at '{path}': {exc}", exc_info=True)
+        return None
+    return path
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Any
+
+log = logging.getLogger("rackscribe")
+
+INDEX_FILE_NAME = ".rackscribe-index.json"
+
+# Cheap probe for the config-change timestamp, compared before pulling the full config.
+CONFIG_PROBE_COMMAND = "show running-config | include Last configuration change"
+
+_LAST_CHANGE_RE = re.compile(r"^! Last configuration change at .*$", re.MULTILINE)
+
+_VOLATILE_LINES_RE = re.compile(
+    # Lines that change without a real configuration change. Ignored when hashing.
+    r"""
+    ^(?:
+        !\ Last\ configuration\ change\ at\ .*
+        | !\ NVRAM\ config\ last\ updated\ at\ .*
+        | !\ No\ configuration\ change\ since\ last\ restart.*
+        | !\ Time:\ .*
+        | \s*ntp\ clock-period\ .*
+    )\n?
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+
+
+def stable_config(config: str) -> str:
+    """A configuration without its volatile lines."""
+    return _VOLATILE_LINES_RE.sub("", config)
+
+
+def config_hash(config: str) -> str:
+    """SHA-256 of a configuration, ignoring volatile lines."""
+    return hashlib.sha256(stable_config(config).encode("utf-8")).hexdigest()
+
+
+def find_last_change(output: str) -> str | None:
+    """Return the 'Last configuration change' line from config or probe output, if any."""
+    m = _LAST_CHANGE_RE.search(output.replace("\r\n", "\n"))
+    return m.group(0).strip() if m else None
+
+
+def is_file_current(out_dir: Path, file_name: str, entry: dict[str, Any] | None) -> bool:
+    """True when the index entry points at file_name and it still has the recorded size."""
+    if not entry or entry.get("file") != file_name:
+        return False
+    try:
+        return bool((out_dir / file_name).stat().st_size == entry["size"])
+    except OSError:
+        return False
+
+
+def load_config_index(out_dir: Path) -> dict[str, dict[str, Any]]:
+    """Load the per-host index from out_dir. Returns an empty index if missing or unreadable."""
+    path = out_dir / INDEX_FILE_NAME
+    try:
+        with path.open(encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc:
+        log.warning(f"Ignoring unreadable config index at '{path}'. All configs will be rewritten.")
+        log.debug(f"Failed to read config index at '{path}': {exc}", exc_info=True)
+        return {}
+
+    return index if isinstance(index, dict) else {}
+
+
+def save_config_index(out_dir: Path, updates: dict[str, dict[str, Any]]) -> bool:
+    """
+    Merge updated host entries into the index in out_dir.
+
+    The index is re-read before writing, so shards sharing an output folder
+    only replace their own hosts.
+    """
+    if not updates:
+        return True
+
+    path = out_dir / INDEX_FILE_NAME
+    index = load_config_index(out_dir)
+    index.update(updates)
+
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        tmp_path.replace(path)
+    except OSError as exc:
+        log.error(f"Failed to write config index at '{path}'. See rackscribe.log for details.")
+        log.debug(f"Failed to write config index at '{path}': {exc}", exc_info=True)
+        return False
+
+    return True
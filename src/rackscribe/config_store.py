@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+from collections.abc import Mapping
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+log = logging.getLogger("rackscribe")
+
+# Content-addressed config objects and per-run manifests, inside the output folder.
+STORE_DIR_NAME = ".rackscribe-store"
+
+# Compression -> file suffix added after '.cfg'. "none" keeps plain per-host files.
+COMPRESSIONS: dict[str, str] = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+_OPTIONAL_REQUIREMENTS = {"zstd": "zstandard"}
+
+
+def missing_compressor(compression: str) -> str | None:
+    """Name of the optional package compression needs but is not installed, if any."""
+    package = _OPTIONAL_REQUIREMENTS.get(compression)
+    if package and importlib.util.find_spec(package) is None:
+        return package
+    return None
+
+
+def config_file_name(name: str, compression: str = "none") -> str:
+    """Per-host configuration file name, e.g. '3. core-1.cfg.gz'."""
+    return f"{name}.cfg{COMPRESSIONS[compression]}"
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        # mtime=0 keeps the object bytes a pure function of the content.
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    import zstandard
+
+    return bytes(zstandard.ZstdCompressor(level=10).compress(data))
+
+
+def read_config(path: Path) -> str:
+    """Read a configuration file, plain or compressed (by suffix)."""
+    data = path.read_bytes()
+    if path.suffix == ".gz":
+        data = gzip.decompress(data)
+    elif path.suffix == ".zst":
+        import zstandard
+
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return data.decode("utf-8")
+
+
+def store_config(out_dir: Path, config: str, compression: str) -> Path:
+    """
+    Save a compressed configuration under its content hash and return its path.
+
+    Objects live in '<out_dir>/.rackscribe-store/objects/<2 hex>/<sha256>.cfg.<ext>'.
+    A configuration already in the store is not written again. Raises OSError.
+    """
+    data = config.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    path = out_dir / STORE_DIR_NAME / "objects" / digest[:2] / config_file_name(digest, compression)
+    if path.exists():
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(_compress(data, compression))
+    tmp_path.replace(path)
+    return path
+
+
+def link_config(object_path: Path, path: Path) -> None:
+    """Point a per-host file at a stored object: a hard link, or a copy where links fail."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        os.link(object_path, tmp_path)
+    except OSError:
+        tmp_path.write_bytes(object_path.read_bytes())
+    tmp_path.replace(path)
+
+
+def write_manifest(out_dir: Path, entries: Mapping[str, Mapping[str, Any]]) -> bool:
+    """
+    Record which stored object every host had in this run.
+
+    Manifests ('<store>/manifests/<timestamp>.json') keep the history of each
+    host's configuration while the objects themselves are stored once.
+    """
+    objects = {
+        ip: {"file": entry["file"], "object": entry["object"]}
+        for ip, entry in entries.items()
+        if entry.get("object")
+    }
+    if not objects:
+        return True
+
+    path = out_dir / STORE_DIR_NAME / "manifests" / f"{datetime.now():%Y%m%d-%H%M%S-%f}.json"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(objects, f, indent=1, sort_keys=True)
+    except OSError as exc:
+        log.error(f"Failed to write config manifest at '{path}'. See rackscribe.log for details.")
+        log.debug(f"Failed to write config manifest at '{path}': {exc}", exc_info=True)
+        return False
+    return True
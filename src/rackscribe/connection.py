@@ -1,9 +1,28 @@
 import logging
 from collections.abc import Iterator, Mapping
 from contextlib import contextmanager
-from typing import Any
+from typing import TYPE_CHECKING, Any, cast
 
-from netmiko import ConnectHandler, NetmikoAuthenticationException, NetmikoTimeoutException
+from .replay import REPLAY_DEVICE_TYPE, ReplayConnection
+from .stats import timed_phase
+
+if TYPE_CHECKING:
+    from netmiko import BaseConnection
+
+    from .session_pool import SessionPool
+
+
+def open_connection(params: Mapping[str, Any]) -> "BaseConnection":
+    """
+    Create the device connection: netmiko's ConnectHandler, or a ReplayConnection
+    serving recorded output when the device type is 'replay'.
+    """
+    if params.get("device_type") == REPLAY_DEVICE_TYPE:
+        return cast("BaseConnection", ReplayConnection(**params))
+
+    from netmiko import ConnectHandler
+
+    return ConnectHandler(**params)
 
 
 @contextmanager
@@ -11,27 +30,59 @@ def net_connection(
     params: Mapping[str, Any],
     *,
     use_enable: bool | None = None,
-) -> Iterator[ConnectHandler]:
+    phases: dict[str, float] | None = None,
+    pool: "SessionPool | None" = None,
+) -> Iterator["BaseConnection"]:
+    """
+    Open a device connection, entering enable mode when a secret is set.
+
+    With a pool, the host's warm session is reused and kept open afterwards.
+    """
+    # Imported on first use: netmiko (paramiko, cryptography) is slow to import.
+    from netmiko import NetmikoAuthenticationException, NetmikoTimeoutException
+
     conn = None
     host = params.get("host", "unknown")
 
     log = logging.getLogger("rackscribe")
 
+    if use_enable is None:
+        use_enable = bool(params.get("secret"))
+
     try:
-        conn = ConnectHandler(**params)
-        if use_enable is None:
-            use_enable = bool(params.get("secret"))
+        if pool is not None:
+            with pool.connection(params, use_enable, phases) as pooled:
+                yield pooled
+            return
+
+        with timed_phase(phases, "connect"):
+            conn = open_connection(params)
         if use_enable:
-            conn.enable()
+            with timed_phase(phases, "enable"):
+                conn.enable()
         yield conn
     except (NetmikoTimeoutException, NetmikoAuthenticationException) as exc:
-        log.error(f"Error talking to {host}. See rackscribe.log for details.")
-        log.debug(f"Error talking to {host}. Details: {exc}", exc_info=True)
+        log.error(
+            "Error talking to %s. See rackscribe.log for details.", host, extra={"host": host}
+        )
+        log.debug(
+            "Error talking to %s. Details: %s", host, exc, exc_info=True, extra={"host": host}
+        )
         raise
 
     except Exception as exc:
-        log.error(f"Unexpected error talking to {host}. See rackscribe.log for details.")
-        log.debug(f"Unexpected error talking to {host}. Details: {exc}", exc_info=True)
+        log.error(
+            "Unexpected error talking to %s. See rackscribe.log for details.",
+            host,
+            extra={"host": host},
+        )
+        log.debug(
+            "Unexpected error talking to %s. Details: %s",
+            host,
+            exc,
+            exc_info=True,
+            extra={"host": host},
+        )
         raise
 
     finally:
@@ -39,4 +90,16 @@ def net_connection(
             try:
                 conn.disconnect()
             except Exception:
-                log.error(f"Disconnect failed for {host}.")
+                log.error("Disconnect failed for %s.", host, extra={"host": host})
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """True for connection errors worth retrying: timeouts and dropped sessions, not bad logins."""
+    from netmiko import NetmikoAuthenticationException, NetmikoTimeoutException, ReadException
+    from paramiko import SSHException
+
+    if isinstance(exc, NetmikoAuthenticationException):
+        return False
+    return isinstance(
+        exc, (NetmikoTimeoutException, ReadException, SSHException, OSError, EOFError)
+    )
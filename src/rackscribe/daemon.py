@@ -0,0 +1,331 @@
+import json
+import logging
+import signal
+import socket
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from .commands import device_session
+from .inventory import Device, device_params, load_devices
+from .metrics import send_metrics
+from .operations import gather_collections
+from .options import COLLECTIONS, RunOptions
+from .session_pool import SessionPool
+from .stats import DeviceResult
+
+log = logging.getLogger("rackscribe")
+
+DEFAULT_LISTEN = "127.0.0.1:8750"
+
+# Only read-only commands can be sent through the API.
+ALLOWED_COMMAND_PREFIX = "show "
+
+# Output filters allowed after '|'. Abbreviations are accepted, as on the device.
+# Filters that write to the device, such as redirect, tee and append, are not.
+ALLOWED_PIPE_FILTERS = ("include", "exclude", "begin", "section", "count")
+
+
+def check_command(command: str) -> str | None:
+    """Why a command may not be sent through the API, or None if it is a read-only show."""
+    if not command.lower().startswith(ALLOWED_COMMAND_PREFIX):
+        return "Only 'show' commands are allowed."
+    # Netmiko would send each embedded line as a command of its own.
+    if any(ord(char) < 32 or ord(char) == 127 for char in command):
+        return "Commands must not contain line breaks or other control characters."
+    if ">" in command:
+        return "Output redirection is not allowed."
+    for pipe in command.split("|")[1:]:
+        name = pipe.split(maxsplit=1)[0].lower() if pipe.strip() else ""
+        if not name or not any(allowed.startswith(name) for allowed in ALLOWED_PIPE_FILTERS):
+            return f"Only these output filters are allowed: {', '.join(ALLOWED_PIPE_FILTERS)}."
+    return None
+
+
+def parse_listen(value: str) -> tuple[str, int]:
+    """Parse a 'HOST:PORT' listen address. Raises ValueError if it is malformed."""
+    host, sep, port_str = value.rpartition(":")
+    try:
+        port = int(port_str)
+    except ValueError:
+        port = -1
+    if not sep or not host or not 0 <= port <= 65535:
+        raise ValueError(f"Invalid listen address '{value}'. Use HOST:PORT, e.g. {DEFAULT_LISTEN}.")
+    return host.strip("[]"), port
+
+
+@dataclass
+class DaemonConfig:
+    """What the daemon collects on its schedule and where it writes the results."""
+
+    inventory: str
+    out_dir: Path
+    out_file: str
+    options: RunOptions
+    # Collections run every interval seconds. Empty to only serve the API.
+    collect: list[str] = field(default_factory=list)
+    interval: float = 0.0
+    show_stats: bool = False
+
+
+def _run_summary(results: list[DeviceResult], elapsed: float) -> dict[str, Any]:
+    return {
+        "elapsed": round(elapsed, 3),
+        "success_count": sum(1 for result in results if result.ok),
+        "failure_count": sum(1 for result in results if not result.ok),
+        "devices": [
+            {
+                "device_number": result.device_number,
+                "ip": result.ip,
+                "hostname": result.hostname,
+                "ok": result.ok,
+                "seconds": round(result.seconds, 3),
+            }
+            for result in results
+        ],
+    }
+
+
+class Daemon:
+    """
+    Long-lived collector that keeps device sessions warm between collections.
+
+    Scheduled and API-triggered collections run one at a time, because they
+    share the output folder. Ad-hoc commands run alongside them and wait only
+    for the host they target.
+    """
+
+    def __init__(self, config: DaemonConfig, pool: SessionPool) -> None:
+        self.config = config
+        self.pool = pool
+        self.devices: dict[str, Device] = {}
+        self.last_run: dict[str, Any] | None = None
+        self.next_run: float | None = None
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def load_inventory(self) -> bool:
+        """Reload the inventory, so edits are picked up without a restart."""
+        devices = load_devices(self.config.inventory)
+        if not devices:
+            log.error(f"Error loading IP address list. Check '{self.config.inventory}'.")
+            return False
+        self.devices = {device.ip: device for device in devices}
+        return True
+
+    def collect(self, collect: list[str], hosts: list[str] | None = None) -> dict[str, Any]:
+        """Collect from every device, or only hosts, and return a run summary."""
+        with self._run_lock:
+            if not self.load_inventory():
+                return {"error": f"Error loading inventory '{self.config.inventory}'."}
+
+            options = self.config.options
+            if hosts is not None:
+                options = replace(options, only_hosts=hosts)
+
+            start = time.perf_counter()
+            results = gather_collections(
+                list(self.devices.values()),
+                collect,
+                out_file=self.config.out_file,
+                out_dir=self.config.out_dir,
+                show_stats=self.config.show_stats,
+                options=options,
+                sessions=self.pool,
+            )
+            summary = _run_summary(results, time.perf_counter() - start)
+            summary["collect"] = collect
+            log.info(
+                f"Sessions: {self.pool.reused} reused, {self.pool.opened} opened, "
+                f"{len(self.pool)} open."
+            )
+            self.last_run = {key: value for key, value in summary.items() if key != "devices"}
+            return summary
+
+    def run_command(self, host: str, command: str) -> dict[str, Any]:
+        """Send one show command to an inventory host over its warm session."""
+        device = self.devices.get(host)
+        if device is None:
+            raise KeyError(host)
+
+        start = time.perf_counter()
+        with device_session(device_params(device), pool=self.pool) as session:
+            output = session.send(command)
+        return {
+            "host": host,
+            "hostname": session.hostname,
+            "command": command,
+            "output": output,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    def status(self) -> dict[str, Any]:
+        next_run = None
+        if self.next_run is not None:
+            next_run = round(max(0.0, self.next_run - time.monotonic()), 1)
+        return {
+            "devices": len(self.devices),
+            "sessions": len(self.pool),
+            "sessions_opened": self.pool.opened,
+            "sessions_reused": self.pool.reused,
+            "collect": self.config.collect,
+            "interval": self.config.interval,
+            "next_run_in": next_run,
+            "last_run": self.last_run,
+        }
+
+    def _schedule_loop(self) -> None:
+        interval = self.config.interval
+        self.next_run = time.monotonic()
+        while not self._stop.wait(max(0.0, self.next_run - time.monotonic())):
+            try:
+                self.collect(self.config.collect)
+            except Exception as exc:
+                log.error("Scheduled collection failed. See rackscribe.log for details.")
+                log.debug(f"Scheduled collection failed: {exc}", exc_info=True)
+            # A run longer than the interval delays the next one rather than stacking up.
+            self.next_run = max(self.next_run + interval, time.monotonic())
+
+    def _prune_loop(self) -> None:
+        period = min(30.0, self.pool.idle_timeout / 2)
+        while not self._stop.wait(period):
+            closed = self.pool.prune()
+            if closed:
+                log.debug(f"Closed {closed} idle or dead session(s).")
+
+    def serve(self, host: str, port: int) -> None:
+        """Serve the HTTP API and run scheduled collections until interrupted."""
+        server = _ApiServer((host, port), self)
+        if host not in ("127.0.0.1", "localhost", "::1"):
+            log.warning(f"The API has no authentication and is listening on {host}.")
+
+        # Stop cleanly on SIGTERM (service managers) as on Ctrl+C.
+        signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+
+        self.load_inventory()
+        threads = [threading.Thread(target=self._prune_loop, daemon=True)]
+        if self.config.collect and self.config.interval:
+            threads.append(threading.Thread(target=self._schedule_loop, daemon=True))
+        for thread in threads:
+            thread.start()
+
+        log.info(f"Daemon listening on http://{host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            log.info("Daemon stopping.")
+        finally:
+            self._stop.set()
+            server.server_close()
+            self.pool.close()
+
+
+def _raise_keyboard_interrupt(signum: int, frame: object) -> None:
+    # A second SIGTERM during shutdown terminates straight away.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    raise KeyboardInterrupt
+
+
+class _ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], daemon: Daemon) -> None:
+        if ":" in address[0]:
+            self.address_family = socket.AF_INET6
+        super().__init__(address, _ApiHandler)
+        self.collector = daemon
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    """
+    Local JSON API.
+
+    GET  /status   sessions, schedule and last run summary
+    GET  /metrics  Prometheus metrics (see metrics.py)
+    POST /collect  {"collect": ["config", ...], "hosts": ["10.0.0.1", ...]}, both optional
+    POST /command  {"host": "10.0.0.1", "command": "show version"}
+    """
+
+    server: _ApiServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        log.debug(f"API {self.address_string()} {format % args}")
+
+    def _send(self, status: HTTPStatus, body: dict[str, Any]) -> None:
+        data = json.dumps(body, indent=1).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object.")
+        return body
+
+    def do_GET(self) -> None:
+        if self.path == "/status":
+            self._send(HTTPStatus.OK, self.server.collector.status())
+        elif self.path == "/metrics":
+            send_metrics(self)
+        else:
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"Unknown path '{self.path}'."})
+
+    def do_POST(self) -> None:
+        collector = self.server.collector
+        try:
+            body = self._read_body()
+        except ValueError as exc:
+            self._send(HTTPStatus.BAD_REQUEST, {"error": f"Invalid JSON body: {exc}"})
+            return
+
+        if self.path == "/collect":
+            collect = body.get("collect") or collector.config.collect or list(COLLECTIONS)
+            hosts = body.get("hosts")
+            if not isinstance(collect, list) or any(name not in COLLECTIONS for name in collect):
+                self._send(
+                    HTTPStatus.BAD_REQUEST,
+                    {"error": f"'collect' must list collections from: {', '.join(COLLECTIONS)}."},
+                )
+                return
+            if hosts is not None and not isinstance(hosts, list):
+                self._send(HTTPStatus.BAD_REQUEST, {"error": "'hosts' must be a list."})
+                return
+            # An empty list asks for no devices, never for the whole inventory.
+            if hosts == []:
+                self._send(
+                    HTTPStatus.BAD_REQUEST,
+                    {"error": "'hosts' is empty. Omit it to collect from every device."},
+                )
+                return
+            log.info(f"API collection of {', '.join(collect)} requested.")
+            summary = collector.collect(
+                collect, [str(host) for host in hosts] if hosts is not None else None
+            )
+            status = HTTPStatus.INTERNAL_SERVER_ERROR if "error" in summary else HTTPStatus.OK
+            self._send(status, summary)
+
+        elif self.path == "/command":
+            host, command = str(body.get("host") or ""), str(body.get("command") or "").strip()
+            error = check_command(command)
+            if error:
+                self._send(HTTPStatus.BAD_REQUEST, {"error": error})
+                return
+            try:
+                self._send(HTTPStatus.OK, collector.run_command(host, command))
+            except KeyError:
+                self._send(
+                    HTTPStatus.NOT_FOUND, {"error": f"Host '{host}' is not in the inventory."}
+                )
+            except Exception as exc:  # noqa: BLE001
+                self._send(HTTPStatus.BAD_GATEWAY, {"error": f"Command failed on {host}: {exc}"})
+
+        else:
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"Unknown path '{self.path}'."})
@@ -1,11 +1,223 @@
+import ipaddress
 import logging
 import os
+import re
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
 
 import yaml
 
+# Numbered inventory: (device_number, ip) pairs. Device numbers come from the
+# position in the full inventory, so they stay stable when it is split up.
+NumberedDevices = list[tuple[int, str]]
 
-def load_inventory(path: str) -> list:
-    """Load inventory from .yaml file. Use dict.fromkeys() to filter duplicates"""
+# Attributes that can be set in 'defaults', in a group or on a device.
+DEVICE_ATTRIBUTES = ("device_type", "port", "credentials", "timeout", "concurrency_group")
+
+_CREDENTIALS_RE = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+
+# Most addresses one CIDR block or range may expand to, so a typo such as
+# '10.0.0.0/8' or an IPv6 prefix cannot produce millions of devices.
+MAX_EXPANSION = 1 << 20
+
+
+class Device:
+    """
+    One inventory device with its resolved attributes.
+
+    Unset attributes (None) fall back to the DEVICE_* environment variables.
+    credentials names the environment variable prefix holding the username,
+    password and secret, e.g. 'DC' for DC_USERNAME / DC_PASSWORD / DC_SECRET.
+    """
+
+    __slots__ = ("ip", "device_type", "port", "credentials", "timeout", "concurrency_group")
+
+    def __init__(
+        self,
+        ip: str,
+        device_type: str | None = None,
+        port: int | None = None,
+        credentials: str | None = None,
+        timeout: float | None = None,
+        concurrency_group: str | None = None,
+    ) -> None:
+        self.ip = ip
+        self.device_type = device_type
+        self.port = port
+        self.credentials = credentials
+        self.timeout = timeout
+        self.concurrency_group = concurrency_group
+
+    def __repr__(self) -> str:
+        attrs = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for name in DEVICE_ATTRIBUTES
+            if getattr(self, name) is not None
+        )
+        return f"Device({self.ip!r}{', ' + attrs if attrs else ''})"
+
+
+def _validate_attributes(attrs: Any, where: str) -> dict[str, Any]:
+    """Check a defaults/group/device attribute mapping. Raises ValueError if it is invalid."""
+    if not isinstance(attrs, dict):
+        raise ValueError(f"{where} must be a mapping of attributes.")
+
+    unknown = [key for key in attrs if key not in DEVICE_ATTRIBUTES]
+    if unknown:
+        raise ValueError(
+            f"{where} has unknown attribute(s) {', '.join(map(str, unknown))}. "
+            f"Use: {', '.join(DEVICE_ATTRIBUTES)}."
+        )
+
+    port = attrs.get("port")
+    if port is not None and (not isinstance(port, int) or not 1 <= port <= 65535):
+        raise ValueError(f"{where}: port must be a number between 1 and 65535.")
+
+    timeout = attrs.get("timeout")
+    if timeout is not None and (not isinstance(timeout, int | float) or timeout <= 0):
+        raise ValueError(f"{where}: timeout must be a number of seconds greater than 0.")
+
+    for key in ("device_type", "credentials", "concurrency_group"):
+        if attrs.get(key) is not None and not isinstance(attrs[key], str):
+            raise ValueError(f"{where}: {key} must be a string.")
+
+    credentials = attrs.get("credentials")
+    if credentials is not None and not _CREDENTIALS_RE.match(credentials):
+        raise ValueError(f"{where}: credentials must be an environment variable prefix, e.g. 'DC'.")
+
+    return attrs
+
+
+def expand_hosts(spec: str) -> Iterator[str]:
+    """
+    Expand one inventory host into IP addresses, lazily.
+
+    spec is an IP address, a CIDR block ('10.0.0.0/24', usable host addresses
+    only) or a range ('10.0.0.10-10.0.0.50', or '10.0.0.10-50' for IPv4).
+    Addresses are yielded in normalized form. Raises ValueError for anything else.
+    """
+    spec = spec.strip()
+    try:
+        if "/" in spec:
+            network = ipaddress.ip_network(spec)
+            count = network.num_addresses
+            addresses: Iterable[Any] = network.hosts()
+        elif "-" in spec:
+            first_str, _, last_str = (part.strip() for part in spec.partition("-"))
+            first = ipaddress.ip_address(first_str)
+            if last_str.isdigit() and first.version == 4:
+                last_str = f"{first_str.rpartition('.')[0]}.{last_str}"
+            last = ipaddress.ip_address(last_str)
+            if last.version != first.version or int(last) < int(first):
+                raise ValueError("the range ends before it starts")
+            count = int(last) - int(first) + 1
+            addresses = (first + offset for offset in range(count))
+        else:
+            count, addresses = 1, [ipaddress.ip_address(spec)]
+    except ValueError as exc:
+        raise ValueError(
+            f"'{spec}' is not a valid IP address, CIDR block or address range ({exc})."
+        ) from None
+
+    if count > MAX_EXPANSION:
+        raise ValueError(f"'{spec}' has {count} addresses, more than the limit of {MAX_EXPANSION}.")
+    yield from map(str, addresses)
+
+
+def _read_host_file(path: Path) -> Iterator[str]:
+    """Host specs in a host file: one per line, '#' starts a comment."""
+    try:
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                spec = line.partition("#")[0].strip()
+                if spec:
+                    yield spec
+    except OSError as exc:
+        raise ValueError(f"Cannot read host file '{path}': {exc.strerror}.") from None
+
+
+def _iter_hosts(
+    entries: list[Any],
+    defaults: dict[str, Any],
+    groups: dict[str, dict[str, Any]],
+    base_dir: Path,
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    """
+    Yield (ip, attributes) for every address the inventory entries expand to.
+
+    The attribute mapping is resolved once per entry and shared by all of its
+    addresses, so a large block costs one mapping rather than one per host.
+    """
+    for entry in entries:
+        if isinstance(entry, dict):
+            if bool(entry.get("host")) == bool(entry.get("file")):
+                raise ValueError(f"Inventory entry {entry} needs either 'host' or 'file'.")
+            entry = dict(entry)
+            host = str(entry.pop("host", "") or "")
+            host_file = str(entry.pop("file", "") or "")
+            member_of = entry.pop("groups", None) or []
+            if isinstance(member_of, str):
+                member_of = [member_of]
+            where = f"Device '{host}'" if host else f"Host file '{host_file}'"
+            own = _validate_attributes(entry, where)
+        else:
+            host, host_file, member_of, own = str(entry), "", [], {}
+            where = f"Device '{host}'"
+
+        attrs = dict(defaults)
+        for group in member_of:
+            if group not in groups:
+                raise ValueError(f"{where} is in undefined group '{group}'.")
+            attrs.update(groups[group])
+        attrs.update(own)
+
+        specs = _read_host_file(base_dir / host_file) if host_file else [host]
+        for spec in specs:
+            for ip in expand_hosts(spec):
+                yield ip, attrs
+
+
+def _parse_devices(data: dict[str, Any], base_dir: Path = Path()) -> Iterator[Device]:
+    """
+    Resolve inventory entries into Devices as they are expanded.
+
+    Attributes are inherited from 'defaults', then from each of the device's
+    groups in the order listed, and finally overridden by the device itself.
+    Host files are looked up relative to base_dir. Raises ValueError on
+    invalid entries, when iteration reaches them.
+    """
+    defaults = _validate_attributes(data.get("defaults") or {}, "'defaults'")
+
+    groups_data = data.get("groups") or {}
+    if not isinstance(groups_data, dict):
+        raise ValueError("'groups' must be a mapping of group name to attributes.")
+    groups = {
+        str(name): _validate_attributes(attrs or {}, f"Group '{name}'")
+        for name, attrs in groups_data.items()
+    }
+
+    entries = data["inventory"] or []
+    if not isinstance(entries, list):
+        raise ValueError("'inventory' must be a list of devices.")
+
+    seen: set[str] = set()
+    for ip, attrs in _iter_hosts(entries, defaults, groups, base_dir):
+        # First entry wins for duplicate IP addresses.
+        if ip not in seen:
+            seen.add(ip)
+            yield Device(ip, **attrs)
+
+
+def load_devices(path: str) -> list[Device]:
+    """
+    Load and validate devices from an inventory .yaml file.
+
+    'inventory' lists IP addresses, CIDR blocks and ranges (see expand_hosts()),
+    or mappings with a 'host' or a host 'file', optional 'groups' and attributes.
+    Optional 'defaults' and 'groups' sections hold shared attributes. Every
+    address is validated here, and duplicate addresses are dropped.
+    """
     devices = None
     log = logging.getLogger("rackscribe")
     try:
@@ -25,8 +237,9 @@ def load_inventory(path: str) -> list:
             )
             return []
 
-        inventory = list(dict.fromkeys(normalized_devices["inventory"]))
-        return inventory
+        # Collected here, so invalid entries are reported below. A run numbers,
+        # shards and looks up every device, so it needs the whole list anyway.
+        return list(_parse_devices(normalized_devices, Path(path).parent))
 
     except FileNotFoundError:
         log.error(f"Inventory file not found: {path}")
@@ -34,19 +247,57 @@ def load_inventory(path: str) -> list:
     except yaml.YAMLError as exc:
         log.error(f"Invalid YAML format in inventory file {path}: {exc}")
 
+    except ValueError as exc:
+        log.error(f"Invalid inventory file {path}: {exc}")
+
     except Exception as exc:
         log.exception(f"Unexpected error loading inventory file {path}: {exc}")
         raise
     return []
 
 
-def load_device_attr(ip: str) -> dict:
-    device = {
-        "device_type": os.getenv("DEVICE_TYPE"),
-        "host": ip,
-        "username": os.getenv("DEVICE_USERNAME"),
-        "password": os.getenv("DEVICE_PASSWORD"),
-        "secret": os.getenv("DEVICE_SECRET"),
+def load_inventory(path: str) -> list[str]:
+    """Load the IP addresses of an inventory .yaml file, without duplicates."""
+    return [device.ip for device in load_devices(path)]
+
+
+def _credentials_prefix(device: Device) -> str:
+    return device.credentials.upper() if device.credentials else "DEVICE"
+
+
+def required_env_vars(devices: list[Device]) -> list[str]:
+    """Environment variables the devices need for their device type and credentials."""
+    required: dict[str, None] = {}
+    for device in devices:
+        if not device.device_type:
+            required["DEVICE_TYPE"] = None
+        prefix = _credentials_prefix(device)
+        required[f"{prefix}_USERNAME"] = None
+        required[f"{prefix}_PASSWORD"] = None
+    return list(required)
+
+
+def device_params(device: Device) -> dict[str, Any]:
+    """Netmiko connection parameters for a device, filling unset attributes from env."""
+    prefix = _credentials_prefix(device)
+    params: dict[str, Any] = {
+        "device_type": device.device_type or os.getenv("DEVICE_TYPE"),
+        "host": device.ip,
+        "username": os.getenv(f"{prefix}_USERNAME"),
+        "password": os.getenv(f"{prefix}_PASSWORD"),
+        "secret": os.getenv(f"{prefix}_SECRET"),
     }
 
-    return device
+    # Optional: SSH port other than 22, e.g. for lab or stand-in devices.
+    port = device.port or os.getenv("DEVICE_PORT")
+    if port:
+        params["port"] = int(port)
+    if device.timeout:
+        params["timeout"] = device.timeout
+
+    return params
+
+
+def load_device_attr(ip: str) -> dict[str, Any]:
+    """Netmiko connection parameters for an IP address, from the DEVICE_* environment variables."""
+    return device_params(Device(ip))
@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import shutil
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, TextIO
+
+from .inventory import NumberedDevices
+from .stats import DeviceResult
+
+log = logging.getLogger("rackscribe")
+
+_META_FILE_NAME = "meta.json"
+
+
+def journal_path(out_dir: Path, out_file: str, shard: tuple[int, int] | None = None) -> Path:
+    """Journal folder for a run writing out_file (or only configs) to out_dir."""
+    name = out_file or "configs"
+    if shard:
+        name += f".shard-{shard[0]}-of-{shard[1]}"
+    return out_dir / f".rackscribe-journal-{name}"
+
+
+def start_journal(path: Path, meta: dict[str, Any]) -> bool:
+    """Discard any previous journal at path and start an empty one."""
+    try:
+        remove_journal(path)
+        path.mkdir(parents=True)
+        with (path / _META_FILE_NAME).open("w", encoding="utf-8") as f:
+            json.dump(meta, f)
+    except OSError as exc:
+        log.error(f"Failed to create run journal at '{path}'. See rackscribe.log for details.")
+        log.debug(f"Failed to create run journal at '{path}': {exc}", exc_info=True)
+        return False
+    return True
+
+
+def load_journal(
+    path: Path,
+    meta: dict[str, Any],
+    devices: NumberedDevices,
+) -> dict[int, DeviceResult] | None:
+    """
+    Successful device results recorded in the journal at path, keyed by device number.
+
+    Only devices still in devices are returned. Returns None when there is no
+    journal or it was written by a run with different options.
+    """
+    try:
+        with (path / _META_FILE_NAME).open(encoding="utf-8") as f:
+            journal_meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        log.warning(f"Ignoring unreadable run journal at '{path}'.")
+        log.debug(f"Failed to read run journal at '{path}': {exc}", exc_info=True)
+        return None
+
+    if journal_meta != meta:
+        log.warning(f"Run journal at '{path}' was written with different options. Ignoring it.")
+        return None
+
+    wanted = set(devices)
+    done: dict[int, DeviceResult] = {}
+    for part in sorted(path.glob("part-*.jsonl")):
+        with part.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = DeviceResult(**json.loads(line))
+                except (ValueError, TypeError):
+                    # Last line of a journal cut short by a crash.
+                    continue
+                if result.ok and (result.device_number, result.ip) in wanted:
+                    done[result.device_number] = result
+    return done
+
+
+def remove_journal(path: Path) -> None:
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class JournalWriter:
+    """
+    Append finished devices to a run journal as they complete.
+
+    Each process writes its own 'part-<pid>.jsonl' file, one JSON object per
+    line, flushed after every device. Thread-safe.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file: TextIO | None = None
+        self._lock = threading.Lock()
+        self._failed = False
+
+    def record(self, result: DeviceResult) -> None:
+        line = json.dumps(asdict(result))
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = (self.path / f"part-{os.getpid()}.jsonl").open(
+                        "a", encoding="utf-8"
+                    )
+                self._file.write(line + "\n")
+                self._file.flush()
+            except OSError as exc:
+                if not self._failed:
+                    log.warning(
+                        f"Failed to write run journal at '{self.path}'. "
+                        "This run cannot be resumed. See rackscribe.log for details."
+                    )
+                    self._failed = True
+                log.debug(
+                    "Failed to journal %s: %s",
+                    result.ip,
+                    exc,
+                    exc_info=True,
+                    extra={"host": result.ip},
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -1,9 +1,64 @@
+import atexit
+import json
 import logging
+import queue
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
 
 LOGGER_NAME = "rackscribe"
 
+# Log file formats: plain text lines or JSON lines.
+LOG_FORMATS = ("text", "json")
 
-def setup_logging(level: str = "INFO", log_file: str = "rackscribe.log") -> logging.Logger:
+# Record attributes set with extra=... that JSON lines carry as their own keys.
+JSON_FIELDS = ("host", "phase", "duration", "phases", "attempt")
+
+# Output handlers of this process, and the listener feeding them when logging is queued.
+_handlers: list[logging.Handler] = []
+_listener: QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, message and any device fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in JSON_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _ThreadQueueHandler(QueueHandler):
+    """
+    Hand records to the listener thread as they are.
+
+    The stock QueueHandler formats every record before queueing it, so it can
+    be pickled. Within one process that is not needed, and leaving it to the
+    listener keeps message formatting and tracebacks off the collecting threads.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(
+    level: str = "INFO",
+    log_file: str = "rackscribe.log",
+    log_format: str = "text",
+    queued: bool = False,
+) -> logging.Logger:
     """
     Configure application-wide logging.
 
@@ -12,6 +67,12 @@ def setup_logging(level: str = "INFO", log_file: str = "rackscribe.log") -> logg
             Logging level name (e.g., "DEBUG", "INFO", "WARNING").
         log_file:
             Path to the log file to write to.
+        log_format:
+            Log file format, "text" or "json" (JSON lines). The console is always text.
+        queued:
+            Only put records on a queue in the calling thread. A listener thread
+            writes them to the file and console, so collecting threads never
+            wait on log I/O. Stopped at exit (see stop_logging()).
 
     Returns:
         The configured logger instance.
@@ -29,7 +90,11 @@ def setup_logging(level: str = "INFO", log_file: str = "rackscribe.log") -> logg
     logger.setLevel(logging.DEBUG)
 
     # logs.log file logging format
-    formatter_file = logging.Formatter("[%(asctime)s] %(levelname)s - %(name)s : %(message)s")
+    formatter_file: logging.Formatter
+    if log_format == "json":
+        formatter_file = JsonFormatter()
+    else:
+        formatter_file = logging.Formatter("[%(asctime)s] %(levelname)s - %(name)s : %(message)s")
 
     # console logging format
     formatter_console = logging.Formatter("%(message)s")
@@ -38,12 +103,51 @@ def setup_logging(level: str = "INFO", log_file: str = "rackscribe.log") -> logg
     file_handler = logging.FileHandler(log_file)
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter_file)
-    logger.addHandler(file_handler)
 
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(numeric_level)
     console_handler.setFormatter(formatter_console)
-    logger.addHandler(console_handler)
+
+    _handlers[:] = [file_handler, console_handler]
+    if queued:
+        global _listener
+        records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        _listener = QueueListener(records, *_handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        logger.addHandler(_ThreadQueueHandler(records))
+    else:
+        for handler in _handlers:
+            logger.addHandler(handler)
 
     return logger
+
+
+def stop_logging() -> None:
+    """Write out queued records and stop the listener thread. Safe to call more than once."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def listen_to_processes(records: Any) -> QueueListener:
+    """
+    Write records that worker processes put on a multiprocessing queue.
+
+    They go to this process's file and console handlers, so one process writes
+    the log file. Stop the returned listener once the workers are done.
+    """
+    listener = QueueListener(records, *_handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def setup_worker_logging(records: Any) -> None:
+    """Send this worker process's records to the parent (see listen_to_processes())."""
+    logger = logging.getLogger(LOGGER_NAME)
+    # Handlers inherited from a forked parent would write, or queue, in this process.
+    logger.handlers.clear()
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(QueueHandler(records))
@@ -0,0 +1,220 @@
+import bisect
+import logging
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from .stats import PHASES, DeviceResult
+
+log = logging.getLogger("rackscribe")
+
+# Prometheus text exposition format.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds of the per-phase latency histogram buckets.
+PHASE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class _Histogram:
+    """Bucket counts (not yet cumulative), sum and count of observed values."""
+
+    __slots__ = ("buckets", "total", "count")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(PHASE_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect.bisect_left(PHASE_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+# Characters escaped in label values.
+_LABEL_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n"})
+
+
+def _labels(**labels: str) -> str:
+    """Prometheus label set, e.g. '{collect="config"}'."""
+    pairs = (f'{name}="{value.translate(_LABEL_ESCAPES)}"' for name, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+class RunMetrics:
+    """
+    Collection metrics in Prometheus format, kept for the life of the process.
+
+    Counters and histograms add up over every run in the process, which
+    matters for the daemon and --metrics-listen. The last_run gauges describe
+    the latest run of each collection, which is what a cron job's textfile
+    shows. Runs are labelled by their collections, e.g. collect="config".
+    Thread-safe.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.devices: dict[tuple[str, str], int] = defaultdict(int)
+        self.retries: dict[str, int] = defaultdict(int)
+        self.config_bytes: dict[str, int] = defaultdict(int)
+        self.phases: dict[str, _Histogram] = {}
+        self.in_flight = 0
+        self.last_runs: dict[str, dict[str, float]] = {}
+
+    @contextmanager
+    def session(self) -> Iterator[None]:
+        """Count a device session as in flight for the duration of the block."""
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def record_device(self, collect: str, result: DeviceResult) -> None:
+        """Add one finished device."""
+        with self._lock:
+            self.devices[collect, "success" if result.ok else "failure"] += 1
+            self.retries[collect] += max(result.attempts - 1, 0)
+            self.config_bytes[collect] += result.config_bytes
+            for phase, seconds in result.phases.items():
+                self.phases.setdefault(phase, _Histogram()).observe(seconds)
+
+    def record_run(
+        self,
+        collect: str,
+        results: list[DeviceResult],
+        elapsed: float,
+        write_seconds: float,
+    ) -> None:
+        """Set the last_run gauges of a finished run."""
+        succeeded = sum(1 for result in results if result.ok)
+        with self._lock:
+            self.last_runs[collect] = {
+                "timestamp_seconds": round(time.time(), 3),
+                "duration_seconds": round(elapsed, 6),
+                "output_write_seconds": round(write_seconds, 6),
+                "devices_attempted": len(results),
+                "devices_succeeded": succeeded,
+                "devices_failed": len(results) - succeeded,
+                "config_bytes": sum(result.config_bytes for result in results),
+            }
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format."""
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP rackscribe_{name} {help_text}")
+            lines.append(f"# TYPE rackscribe_{name} {kind}")
+
+        with self._lock:
+            family("devices_total", "counter", "Devices collected from, by outcome.")
+            for (collect, outcome), count in sorted(self.devices.items()):
+                labels = _labels(collect=collect, outcome=outcome)
+                lines.append(f"rackscribe_devices_total{labels} {count}")
+
+            family("retries_total", "counter", "Connection attempts retried.")
+            for collect, count in sorted(self.retries.items()):
+                lines.append(f"rackscribe_retries_total{_labels(collect=collect)} {count}")
+
+            family("config_bytes_total", "counter", "Bytes of running configuration pulled.")
+            for collect, count in sorted(self.config_bytes.items()):
+                lines.append(f"rackscribe_config_bytes_total{_labels(collect=collect)} {count}")
+
+            family("phase_seconds", "histogram", "Per-device time spent in each phase.")
+            for phase in sorted(self.phases, key=_phase_order):
+                histogram = self.phases[phase]
+                cumulative = 0
+                for bound, count in zip((*PHASE_BUCKETS, "+Inf"), histogram.buckets, strict=True):
+                    cumulative += count
+                    labels = _labels(phase=phase, le=str(bound))
+                    lines.append(f"rackscribe_phase_seconds_bucket{labels} {cumulative}")
+                labels = _labels(phase=phase)
+                lines.append(f"rackscribe_phase_seconds_sum{labels} {histogram.total:.6f}")
+                lines.append(f"rackscribe_phase_seconds_count{labels} {histogram.count}")
+
+            family("sessions_in_flight", "gauge", "Device sessions open in this process.")
+            lines.append(f"rackscribe_sessions_in_flight {self.in_flight}")
+
+            gauges: dict[str, list[str]] = defaultdict(list)
+            for collect, run in sorted(self.last_runs.items()):
+                for name, value in run.items():
+                    gauges[name].append(
+                        f"rackscribe_last_run_{name}{_labels(collect=collect)} {value}"
+                    )
+            for name, samples in gauges.items():
+                family(f"last_run_{name}", "gauge", f"Latest run: {name.replace('_', ' ')}.")
+                lines += samples
+
+        return "\n".join(lines) + "\n"
+
+
+def _phase_order(phase: str) -> int:
+    return PHASES.index(phase) if phase in PHASES else len(PHASES)
+
+
+# Metrics of this process.
+METRICS = RunMetrics()
+
+
+def write_metrics_file(path: Path) -> bool:
+    """
+    Write the metrics for node_exporter's textfile collector.
+
+    The file is replaced atomically, so the collector never reads a partial file.
+    """
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(METRICS.render(), encoding="utf-8")
+        tmp_path.replace(path)
+    except OSError as exc:
+        log.error(f"Failed to write metrics file at '{path}'. See rackscribe.log for details.")
+        log.debug(f"Failed to write metrics file at '{path}': {exc}", exc_info=True)
+        return False
+    return True
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format: str, *args: Any) -> None:
+        log.debug(f"Metrics {self.address_string()} {format % args}")
+
+    def do_GET(self) -> None:
+        if self.path != "/metrics":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        send_metrics(self)
+
+
+def send_metrics(handler: BaseHTTPRequestHandler) -> None:
+    """Answer an HTTP request with the current metrics."""
+    data = METRICS.render().encode("utf-8")
+    handler.send_response(HTTPStatus.OK)
+    handler.send_header("Content-Type", CONTENT_TYPE)
+    handler.send_header("Content-Length", str(len(data)))
+    handler.end_headers()
+    handler.wfile.write(data)
+
+
+def serve_metrics(host: str, port: int) -> ThreadingHTTPServer:
+    """Serve GET /metrics from a background thread for the rest of the process."""
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        if ":" in host:
+            address_family = socket.AF_INET6
+
+    server = Server((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    log.info(f"Metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -1,142 +1,905 @@
 import logging
+import multiprocessing
 import time
-from collections.abc import Mapping
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
-from .commands import get_hostname, send_cmd
-from .inventory import load_device_attr
+from .async_engine import claim_result, run_devices_async
+from .commands import device_session
+from .config_diff import PREVIOUS_DIR_NAME, diff_changed_configs, write_change_report
+from .config_index import (
+    CONFIG_PROBE_COMMAND,
+    config_hash,
+    find_last_change,
+    is_file_current,
+    load_config_index,
+    save_config_index,
+)
+from .config_store import config_file_name, write_manifest
+from .connection import is_transient_error
+from .inventory import Device, NumberedDevices, device_params
+from .journal import JournalWriter, journal_path, load_journal, remove_journal, start_journal
+from .logging_setup import listen_to_processes, setup_logging, setup_worker_logging
+from .metrics import METRICS, write_metrics_file
+from .options import COLLECTIONS, RunOptions
 from .output import (
     create_config_file,
-    create_inventory_file,
+    create_stored_config_file,
+    open_inventory_file,
     process_inventory_output,
     remove_config_preamble,
 )
+from .profiling import memory_phase
+from .replay import REPLAY_DEVICE_TYPE
+from .report import build_run_report, log_run_report, write_run_report
+from .result_cache import CachedResult, load_cached_results, save_cached_results
+from .retry import (
+    SSH_PORT,
+    CircuitBreaker,
+    RetryPolicy,
+    discover_reachable,
+    load_failures,
+    save_failures,
+    tcp_reachable,
+)
 from .sanitize import check_ip_address
+from .scheduling import (
+    ORDER_WINDOW_PER_WORKER,
+    DeviceQueue,
+    GroupLimits,
+    RateLimiter,
+    device_limit_keys,
+    load_durations,
+    save_durations,
+    start_order,
+)
+from .session_pool import SessionPool
+from .sharding import merge_shard_files, shard_devices, shard_file_path, write_shard_file
+from .stats import DeviceResult, RunStats, timed_phase
+from .writers import InventoryWriter
 
 log = logging.getLogger("rackscribe")
 
 
-def gather_running_configs(
-    ip_list: list[str],
-    out_dir: Path,
-    show_stats: bool = False,
-) -> None:
-    """Connect to each device and save running configurations."""
-    log.info("RACKSCRIBE START - OPERATION RUNNING CONFIGURATIONS")
+def run_devices(
+    devices: NumberedDevices,
+    task: Callable[[int, str], DeviceResult],
+    workers: int = 1,
+    on_result: Callable[[DeviceResult], None] | None = None,
+    limits: GroupLimits | None = None,
+) -> list[DeviceResult]:
+    """
+    Run task(device_number, ip) for every numbered device.
 
-    start = time.perf_counter()
+    Devices start in the order given. With more than one worker, they are fanned
+    out across a bounded thread pool, and a device whose group or platform is at
+    its cap (limits) waits while later devices from other groups go ahead.
+    on_result is called from the calling thread as each device finishes. The
+    returned results are always in inventory order, so device numbers used in
+    file names stay deterministic regardless of completion order.
+    """
+    results: dict[int, DeviceResult] = {}
 
-    device_number = 0
-    success_count = 0
-    failure_count = 0
-
-    for ip in ip_list:
-        device_number += 1
-        try:
-            if not check_ip_address(ip):
-                log.error(f"Invalid IP address: '{ip}'")
-                failure_count += 1
-                continue
-
-            log.info(f"Connecting to host {ip} - Operation Gather Running Configurations")
-
-            device: Mapping[str, Any] = load_device_attr(ip)
-            hostname = get_hostname(device)
-            output = send_cmd(device, "show running-config")
-            final_output = remove_config_preamble(output)
-
-            if create_config_file(f"{device_number}. {hostname}", out_dir, final_output):
-                success_count += 1
-            else:
-                failure_count += 1
-        except Exception as exc:  # noqa: BLE001
-            failure_count += 1
-            log.warning(
-                f"No configuration saved for IP address {ip}. See rackscribe.log for details."
-            )
-            log.debug(
-                f"Exception while collecting running configuration for IP address {ip}. Details: {exc}",
-                exc_info=True,
-            )
-    elapsed = time.perf_counter() - start
+    if workers <= 1:
+        for device_number, ip in devices:
+            result = task(device_number, ip)
+            if on_result:
+                on_result(result)
+            results[device_number] = result
+        return [results[device_number] for device_number in sorted(results)]
 
-    if show_stats:
-        total = success_count + failure_count
-        rate = success_count / elapsed if elapsed > 0 and total > 0 else 0.0
+    queue = DeviceQueue(devices, limits)
+    running: dict[Future[DeviceResult], str] = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rackscribe") as pool:
+        while queue or running:
+            while len(running) < workers and (device := queue.pop_ready()) is not None:
+                running[pool.submit(task, *device)] = device[1]
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                queue.release(running.pop(future))
+                result = future.result()
+                if on_result:
+                    on_result(result)
+                results[result.device_number] = result
+
+    return [results[device_number] for device_number in sorted(results)]
+
+
+class OrderedRowSink:
+    """
+    Stream inventory rows to a writer in inventory order as devices finish.
+
+    Results that finish early wait in a small buffer until every device before
+    them has been written. Rows are moved out of each result once written.
+    """
+
+    def __init__(self, writer: InventoryWriter, devices: NumberedDevices) -> None:
+        self.writer = writer
+        self._order = iter([device_number for device_number, _ in devices])
+        self._next = next(self._order, None)
+        self._pending: dict[int, tuple[DeviceResult, list[list[str]]]] = {}
+
+    def add(self, result: DeviceResult) -> None:
+        self._pending[result.device_number] = (result, result.rows)
+        result.rows = []
+        while self._next is not None and self._next in self._pending:
+            ready, rows = self._pending.pop(self._next)
+            with timed_phase(ready.phases, "write"):
+                self.writer.append(rows)
+            self._next = next(self._order, None)
+
+
+@dataclass
+class CollectionJob:
+    """What to collect and where to put it, shared by every device in a run."""
+
+    collect: list[str]
+    out_dir: Path
+    operation: str
+    options: RunOptions
+    # Inventory records by IP address, for per-device connection attributes.
+    inventory: dict[str, Device] = field(default_factory=dict)
+    # Per-host content-hash index from the previous run (see config_index.py).
+    config_index: dict[str, dict[str, Any]] = field(default_factory=dict)
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+    # Run journal folder that finished devices are appended to (see journal.py).
+    journal_path: Path | None = None
+    # Warm sessions reused across runs (daemon mode only, never sent to worker processes).
+    sessions: SessionPool | None = None
+
+
+def _save_config(
+    result: DeviceResult,
+    hostname: str,
+    config: str,
+    job: CollectionJob,
+) -> bool:
+    """Write a running configuration unless the previous copy is identical."""
+    name = f"{result.device_number}. {hostname}"
+    compression = job.options.compression
+    file_name = config_file_name(name, compression)
+    digest = config_hash(config)
+    entry = job.config_index.get(result.ip)
+
+    if (
+        not job.options.full
+        and entry is not None
+        and entry["hash"] == digest
+        and is_file_current(job.out_dir, file_name, entry)
+    ):
         log.info(
-            f"[STATS] Running-config operation completed in {elapsed:2f} seconds | "
-            f"Devices: {total} - Success: {success_count} - Failed: {failure_count} | "
-            f"Rate: {rate:.2f} seconds per device."
+            "Configuration unchanged for %s. Skipping write.", hostname, extra=_host(result.ip)
         )
+        result.config_changed = False
+        result.config_entry = {**entry, "last_change": find_last_change(config)}
+        return True
+
+    if job.options.diff and entry is not None and entry["hash"] != digest:
+        result.previous_config = _keep_previous(job.out_dir, entry["file"])
+
+    object_path = None
+    if compression == "none":
+        written = create_config_file(name, job.out_dir, config)
     else:
+        object_path = create_stored_config_file(name, job.out_dir, config, compression)
+        written = object_path is not None
+    if not written:
+        if result.previous_config:
+            _restore_previous(job.out_dir, result.previous_config, file_name)
+            result.previous_config = None
+        return False
+
+    result.config_changed = entry is None or entry["hash"] != digest
+    result.config_entry = {
+        "file": file_name,
+        "hash": digest,
+        "size": (job.out_dir / file_name).stat().st_size,
+        "last_change": find_last_change(config),
+    }
+    if object_path:
+        result.config_entry["object"] = object_path.relative_to(job.out_dir).as_posix()
+    return True
+
+
+def _keep_previous(out_dir: Path, file_name: str) -> str | None:
+    """Move the previous copy of a config aside for the diff stage, before it is overwritten."""
+    previous = Path(PREVIOUS_DIR_NAME) / file_name
+    try:
+        (out_dir / previous).parent.mkdir(parents=True, exist_ok=True)
+        (out_dir / file_name).replace(out_dir / previous)
+    except OSError as exc:
+        log.debug("No previous copy of '%s' to diff: %s", file_name, exc)
+        return None
+    return previous.as_posix()
+
+
+def _restore_previous(out_dir: Path, previous: str, file_name: str) -> None:
+    """Put a previous copy back after writing its replacement failed."""
+    try:
+        (out_dir / previous).replace(out_dir / file_name)
+    except OSError as exc:
+        log.debug("Failed to restore previous copy of '%s': %s", file_name, exc, exc_info=True)
+
+
+def _read_device(
+    device: Mapping[str, Any],
+    result: DeviceResult,
+    job: CollectionJob,
+) -> tuple[dict[str, str], bool]:
+    """
+    Send the collection commands over one session.
+
+    Returns the outputs keyed by command, and whether --probe found the saved
+    configuration current, in which case it was not pulled.
+    """
+    collect = job.collect
+    entry = job.config_index.get(result.ip)
+    commands = [COLLECTIONS[name] for name in collect]
+    output: dict[str, str] = {}
+    config_current = False
+
+    with device_session(device, result.phases, pool=job.sessions) as session:
+        hostname = result.hostname = session.hostname
+
+        if "config" in collect and job.options.probe and entry and entry.get("last_change"):
+            probe = find_last_change(session.send(CONFIG_PROBE_COMMAND))
+            file_name = config_file_name(
+                f"{result.device_number}. {hostname}", job.options.compression
+            )
+            config_current = probe == entry["last_change"] and is_file_current(
+                job.out_dir, file_name, entry
+            )
+            if config_current:
+                log.info(
+                    "Configuration unchanged for %s (probe). Skipping pull.",
+                    hostname,
+                    extra=_host(result.ip),
+                )
+                commands.remove(COLLECTIONS["config"])
+
+        for cmd in commands:
+            output[cmd] = session.send_bulk(cmd) if job.options.bulk_read else session.send(cmd)
+
+    return output, config_current
+
+
+def _collect_device(
+    device_number: int,
+    ip: str,
+    job: CollectionJob,
+    throttle: RateLimiter | None = None,
+) -> DeviceResult:
+    """
+    Run every requested collection on one device over a single session.
+
+    throttle, when given, spaces out every connection attempt, retries included.
+    """
+    result = DeviceResult(device_number, ip)
+    collect = job.collect
+    options = job.options
+    start = time.perf_counter()
+    try:
+        device: Mapping[str, Any] = device_params(job.inventory.get(ip) or Device(ip))
+
+        # Replayed devices have no SSH port to check.
+        if options.preflight and device.get("device_type") != REPLAY_DEVICE_TYPE:
+            port = int(device.get("port") or SSH_PORT)
+            with timed_phase(result.phases, "preflight"):
+                reachable = tcp_reachable(ip, port, options.preflight_timeout)
+            if not reachable:
+                log.error(
+                    "Host %s is not reachable on port %s. Skipping.",
+                    ip,
+                    port,
+                    extra=_host(ip, phase="preflight"),
+                )
+                return result
+
+        log.info("Connecting to host %s - Operation %s", ip, job.operation, extra=_host(ip))
+
+        for attempt in range(1, job.retry.retries + 2):
+            result.attempts = attempt
+            if throttle:
+                throttle.wait()
+            try:
+                output, config_current = _read_device(device, result, job)
+                break
+            except Exception as exc:
+                if attempt > job.retry.retries or not is_transient_error(exc):
+                    raise
+                delay = job.retry.delay(attempt)
+                log.warning(
+                    "Attempt %d of %d failed for %s. Retrying in %.1f seconds.",
+                    attempt,
+                    job.retry.retries + 1,
+                    ip,
+                    delay,
+                    extra=_host(ip, attempt=attempt),
+                )
+                time.sleep(delay)
+
+        # A device the async engine already timed out writes nothing.
+        if not claim_result():
+            log.debug("Discarding output of %s, which arrived after its timeout.", ip)
+            return result
+
+        hostname = result.hostname
+        write_ok = True
+        if config_current:
+            result.config_changed = False
+            result.config_entry = job.config_index.get(ip)
+        elif "config" in collect:
+            result.config_bytes = len(output[COLLECTIONS["config"]].encode("utf-8"))
+            with timed_phase(result.phases, "parse"):
+                final_output = remove_config_preamble(output[COLLECTIONS["config"]])
+            with timed_phase(result.phases, "write"):
+                write_ok = _save_config(result, hostname, final_output, job)
+
+        if "inventory" in collect:
+            with timed_phase(result.phases, "parse"):
+                result.rows = process_inventory_output(
+                    hostname, output[COLLECTIONS["inventory"]], device.get("device_type")
+                )
+            log.info(
+                "Inventory information retrieved successfully from %s (%s)",
+                hostname,
+                ip,
+                extra=_host(ip),
+            )
+
+        result.ok = write_ok
+
+    except Exception as exc:  # noqa: BLE001
+        # The phase that failed is the last one entered.
+        failed = _host(ip, phase=next(reversed(result.phases), None))
+        names = ", ".join(collect)
+        log.warning(
+            "No %s data saved for %s. See rackscribe.log for details.", names, ip, extra=failed
+        )
         log.debug(
-            f"Running-config operation elapsed time: {elapsed:.2f} seconds "
-            f"(success={success_count}, failure={failure_count})"
+            "Exception while collecting %s for IP address %s. Details: %s",
+            names,
+            ip,
+            exc,
+            exc_info=True,
+            extra=failed,
+        )
+    finally:
+        result.seconds = time.perf_counter() - start
+        log.debug(
+            "Finished %s in %.3f seconds",
+            ip,
+            result.seconds,
+            extra=_host(
+                ip,
+                duration=round(result.seconds, 3),
+                phases={name: round(seconds, 3) for name, seconds in result.phases.items()},
+            ),
+        )
+    return result
+
+
+def _host(ip: str, **fields: Any) -> dict[str, Any]:
+    """Per-device fields for a log record (see logging_setup.JSON_FIELDS)."""
+    return {"host": ip, **fields}
+
+
+def _collect_devices(
+    devices: NumberedDevices,
+    job: CollectionJob,
+    on_result: Callable[[DeviceResult], None] | None = None,
+) -> list[DeviceResult]:
+    """Collect from devices in this process with the selected engine."""
+    options = job.options
+    breaker = CircuitBreaker(options.max_failures)
+    journal = JournalWriter(job.journal_path) if job.journal_path else None
+
+    # Caps and the connection rate are shared out evenly when the run is split
+    # across local processes. _gather() ensures every process gets at least one slot.
+    limits = None
+    if options.group_limits:
+        caps = {name: limit // options.processes for name, limit in options.group_limits.items()}
+        limits = GroupLimits(caps, job.inventory)
+    throttle = RateLimiter(options.connect_rate / options.processes)
+
+    def task(device_number: int, ip: str) -> DeviceResult:
+        if breaker.is_open:
+            log.debug("Circuit breaker open. Skipping %s.", ip, extra=_host(ip))
+            return DeviceResult(device_number, ip)
+        with METRICS.session():
+            result = _collect_device(device_number, ip, job, throttle)
+        if not claim_result():
+            return result
+        breaker.record(result.ok)
+        if journal:
+            journal.record(result)
+        return result
+
+    try:
+        if options.engine == "async":
+            return run_devices_async(
+                devices,
+                task,
+                workers=options.workers,
+                timeout=options.timeout,
+                on_result=on_result,
+                limits=limits,
+            )
+        return run_devices(
+            devices, task, workers=options.workers, on_result=on_result, limits=limits
+        )
+    finally:
+        if journal:
+            journal.close()
+
+
+def _init_worker_process(log_level: str, log_format: str, log_records: Any) -> None:
+    if log_records is not None:
+        setup_worker_logging(log_records)
+    else:
+        # No-op when handlers were inherited from the parent (fork start method).
+        setup_logging(level=log_level, log_format=log_format)
+
+
+def run_processes(
+    devices: NumberedDevices,
+    job: CollectionJob,
+    on_result: Callable[[DeviceResult], None] | None = None,
+) -> list[DeviceResult]:
+    """
+    Split devices across options.processes local processes.
+
+    Each process collects its share with the selected engine and worker count.
+    on_result is called as each process hands back its share. Results are
+    merged back into inventory order.
+    """
+    count = job.options.processes
+    shards = [shard_devices(devices, index, count) for index in range(1, count + 1)]
+    shards = [shard for shard in shards if shard]
+
+    # With --log-queue, workers send their records to this process to write.
+    log_records: multiprocessing.Queue[Any] | None = (
+        multiprocessing.Queue() if job.options.log_queue else None
+    )
+    listener = listen_to_processes(log_records) if log_records is not None else None
+
+    results: list[DeviceResult] = []
+    try:
+        with ProcessPoolExecutor(
+            max_workers=len(shards),
+            initializer=_init_worker_process,
+            initargs=(job.options.log_level, job.options.log_format, log_records),
+        ) as pool:
+            futures = [pool.submit(_collect_devices, shard, job) for shard in shards]
+            for future in as_completed(futures):
+                for result in future.result():
+                    if on_result:
+                        on_result(result)
+                    results.append(result)
+    finally:
+        if listener:
+            listener.stop()
+
+    results.sort(key=lambda result: result.device_number)
+    return results
+
+
+def _gather(
+    ip_list: Sequence[str | Device],
+    collect: list[str],
+    out_file: str,
+    out_dir: Path,
+    show_stats: bool,
+    options: RunOptions | None,
+    *,
+    operation: str,
+    label: str,
+    sessions: SessionPool | None = None,
+) -> list[DeviceResult]:
+    """Shared driver for all gather operations. Returns the results in inventory order."""
+    options = options or RunOptions()
+    start = time.perf_counter()
+    stats = RunStats(workers=options.workers * options.processes, engine=options.engine)
+
+    records = [entry if isinstance(entry, Device) else Device(entry) for entry in ip_list]
+    devices: NumberedDevices = list(enumerate((record.ip for record in records), start=1))
+    # Inventories from load_devices() are already validated, but callers may pass any list.
+    # Invalid addresses are recorded as failed devices below, without connecting.
+    invalid = {ip for _, ip in devices if not check_ip_address(ip)}
+    for ip in sorted(invalid):
+        log.error(f"Invalid IP address: '{ip}'")
+    if options.only_hosts is not None:
+        wanted = set(options.only_hosts)
+        devices = [(device_number, ip) for device_number, ip in devices if ip in wanted]
+        if not devices:
+            log.warning("None of the requested hosts are in the inventory.")
+            return []
+    if options.retry_failed:
+        failures = load_failures(out_dir)
+        devices = [(device_number, ip) for device_number, ip in devices if ip in failures]
+        if not devices:
+            log.info(f"No failed devices to retry in '{out_dir}'.")
+            return []
+        log.info(f"Retrying {len(devices)} device(s) that failed in the previous run.")
+    if options.shard:
+        devices = shard_devices(devices, *options.shard)
+        log.info(f"Running shard {options.shard[0]}/{options.shard[1]}: {len(devices)} device(s).")
+    too_low = [name for name, limit in options.group_limits.items() if limit < options.processes]
+    if too_low:
+        log.error(
+            f"Limits on {', '.join(too_low)} are lower than the {options.processes} processes "
+            "they would be shared across. Raise them or use fewer processes."
+        )
+        return []
+    if options.discover:
+        devices = _discover(devices, records, invalid)
+        if not devices:
+            log.warning("No device answered the discovery sweep.")
+            return []
+
+    # Finished devices are journaled as they complete, so an interrupted run
+    # can be picked up again with --resume.
+    journal = journal_path(out_dir, out_file, options.shard)
+    journal_meta = {"collect": collect, "inventory_size": len(ip_list)}
+    done: dict[int, DeviceResult] = {}
+    if options.resume:
+        loaded = load_journal(journal, journal_meta, devices)
+        if loaded is None:
+            log.warning(f"No run journal to resume from at '{journal}'. Starting a full run.")
+        else:
+            done = loaded
+            log.info(
+                f"Resuming run: {len(done)} device(s) already collected, "
+                f"{len(devices) - len(done)} remaining."
+            )
+    journal_ok = bool(done) or start_journal(journal, journal_meta)
+
+    job = CollectionJob(
+        collect,
+        out_dir,
+        operation,
+        options,
+        retry=RetryPolicy(retries=options.retries, base_delay=options.retry_delay),
+        journal_path=journal if journal_ok else None,
+        inventory={record.ip: record for record in records},
+        sessions=sessions,
+    )
+    if "config" in collect:
+        job.config_index = load_config_index(out_dir)
+
+    # Inventory rows are streamed to the workbook as devices finish, except for
+    # shards, whose rows are written to the workbook by 'rackscribe --merge'.
+    sink = None
+    if "inventory" in collect and not options.shard:
+        writer = open_inventory_file(out_file, out_dir, options.output_format)
+        sink = OrderedRowSink(writer, devices)
+    metrics_label = ",".join(collect)
+    # With --max-age, parsed inventory rows are kept in the result cache.
+    use_cache = options.max_age is not None and "inventory" in collect
+    device_types = {ip: _device_type(job.inventory, ip) for _, ip in devices} if use_cache else {}
+    to_cache: list[CachedResult] = []
+
+    def on_result(result: DeviceResult) -> None:
+        if use_cache and result.ok and not result.cached:
+            # Taken before the sink moves the rows out of the result.
+            to_cache.append(
+                CachedResult(result.ip, result.hostname, device_types[result.ip], result.rows)
+            )
+        if sink:
+            sink.add(result)
+        METRICS.record_device(metrics_label, result)
+
+    # Devices finished before an interruption go through the same path as new ones.
+    if sink:
+        for result in sorted(done.values(), key=lambda result: result.device_number):
+            sink.add(result)
+    remaining = [device for device in devices if device[0] not in done]
+
+    # Invalid addresses count as failed devices, so --retry-failed picks them up.
+    failed = [DeviceResult(device_number, ip) for device_number, ip in remaining if ip in invalid]
+    for result in failed:
+        on_result(result)
+    if failed:
+        remaining = [device for device in remaining if device[1] not in invalid]
+
+    # Inventory-only runs serve devices with fresh cache entries without connecting.
+    cached: list[DeviceResult] = []
+    if use_cache and collect == ["inventory"]:
+        remaining, cached = _serve_from_cache(remaining, out_dir, device_types, options)
+        for result in cached:
+            on_result(result)
+
+    # Slow devices and the busiest capped groups start first, to shorten the run.
+    # A single worker runs devices one after another, where order does not matter.
+    _check_group_limits(options.group_limits, job.inventory)
+    concurrency = options.workers * options.processes
+    if concurrency > 1:
+        remaining = start_order(
+            remaining,
+            job.inventory,
+            options.group_limits,
+            load_durations(out_dir),
+            window=concurrency * ORDER_WINDOW_PER_WORKER if sink else None,
         )
 
+    with memory_phase("collect"):
+        if options.processes > 1:
+            results = run_processes(remaining, job, on_result)
+        else:
+            results = _collect_devices(remaining, job, on_result)
+
+    save_durations(out_dir, results)
+    if use_cache:
+        save_cached_results(out_dir, "inventory", to_cache)
+    if done or cached or failed:
+        results = sorted(
+            [*done.values(), *cached, *failed, *results], key=lambda result: result.device_number
+        )
+
+    for result in results:
+        stats.record(result)
+
+    write_start = time.perf_counter()
+    with memory_phase("output"):
+        if "config" in collect:
+            config_entries = {
+                result.ip: result.config_entry for result in results if result.config_entry
+            }
+            save_config_index(out_dir, config_entries)
+            if options.compression != "none":
+                write_manifest(out_dir, config_entries)
+            if options.diff:
+                _report_config_changes(out_dir, results)
+
+        save_failures(
+            out_dir,
+            attempted=[result.ip for result in results],
+            failed=[result.ip for result in results if not result.ok],
+        )
+
+        status = None
+        write_ok = True
+        if options.shard:
+            stats.elapsed = time.perf_counter() - start
+            path = shard_file_path(out_file, out_dir, *options.shard)
+            write_ok = write_shard_file(path, *options.shard, stats, results)
+            status = "Shard saved" if write_ok else "Completed with output errors"
+        elif sink:
+            write_ok = sink.writer.close()
+            status = "Completed successfully" if write_ok else "Completed with output errors"
+
+    # The journal is kept when the final output failed, so --resume can rebuild it.
+    if journal_ok and write_ok:
+        remove_journal(journal)
+
+    stats.elapsed = time.perf_counter() - start
+    write_seconds = time.perf_counter() - write_start
+    write_seconds += sum(result.phases.get("write", 0.0) for result in results)
+    METRICS.record_run(metrics_label, results, stats.elapsed, write_seconds)
+    if options.metrics_file:
+        write_metrics_file(options.metrics_file)
+    _report_run(label, stats, results, show_stats, options, status)
+    return results
+
+
+def _report_config_changes(out_dir: Path, results: list[DeviceResult]) -> None:
+    """Diff the configs that changed in this run and write the change report."""
+    changes = diff_changed_configs(out_dir, results)
+    if not changes:
+        log.info("Config diff: no configuration changes.")
+        return
+
+    path = write_change_report(out_dir, changes)
+    added = sum(change.added for change in changes)
+    removed = sum(change.removed for change in changes)
+    log.info(
+        f"Config diff: {len(changes)} configuration(s) changed, +{added} -{removed} lines."
+        + (f" Report: '{path}'" if path else "")
+    )
+
+
+def _discover(
+    devices: NumberedDevices, records: list[Device], invalid: set[str]
+) -> NumberedDevices:
+    """
+    Keep the devices whose SSH port answers a concurrent discovery sweep.
+
+    Invalid addresses are kept, to be recorded as failed devices.
+    """
+    inventory = {record.ip: record for record in records}
+    targets: dict[str, int] = {}
+    for _, ip in devices:
+        params = device_params(inventory.get(ip) or Device(ip))
+        # Replayed devices have no SSH port to check.
+        if ip not in invalid and params.get("device_type") != REPLAY_DEVICE_TYPE:
+            targets[ip] = int(params.get("port") or SSH_PORT)
+    if not targets:
+        return devices
+
+    start = time.perf_counter()
+    reachable = discover_reachable(targets.items())
+    kept = [
+        (device_number, ip) for device_number, ip in devices if ip not in targets or ip in reachable
+    ]
+    log.info(
+        f"Discovery: {len(kept)} of {len(devices)} device(s) answered in "
+        f"{time.perf_counter() - start:.1f} seconds. Skipping {len(devices) - len(kept)}."
+    )
+    return kept
+
+
+def _device_type(inventory: Mapping[str, Device], ip: str) -> str:
+    return str(device_params(inventory.get(ip) or Device(ip)).get("device_type") or "")
+
+
+def _serve_from_cache(
+    devices: NumberedDevices,
+    out_dir: Path,
+    device_types: dict[str, str],
+    options: RunOptions,
+) -> tuple[NumberedDevices, list[DeviceResult]]:
+    """Split devices into those to collect and results served from fresh cache entries."""
+    fresh = load_cached_results(out_dir, "inventory", device_types, options.max_age or 0.0)
+    remaining: NumberedDevices = []
+    cached: list[DeviceResult] = []
+    for device_number, ip in devices:
+        entry = fresh.get(ip)
+        if entry is None:
+            remaining.append((device_number, ip))
+        else:
+            cached.append(
+                DeviceResult(
+                    device_number,
+                    ip,
+                    ok=True,
+                    hostname=entry.hostname,
+                    rows=entry.rows,
+                    cached=True,
+                )
+            )
+    log.info(
+        f"Result cache: {len(cached)} device(s) served from cache, {len(remaining)} to collect."
+    )
+    return remaining, cached
+
+
+def _check_group_limits(group_limits: Mapping[str, int], inventory: Mapping[str, Device]) -> None:
+    """Warn about --limit names that match no concurrency group or platform in the inventory."""
+    names = {key for device in inventory.values() for key in device_limit_keys(device)}
+    for name in group_limits:
+        if name not in names:
+            log.warning(f"Limit '{name}' matches no concurrency group or device type. Ignoring.")
+
+
+def _report_run(
+    label: str,
+    stats: RunStats,
+    results: list[DeviceResult],
+    show_stats: bool,
+    options: RunOptions,
+    status: str | None,
+) -> None:
+    """Log the stats summary and, when requested, phase percentiles and the run report."""
+    stats.report(label, show_stats, status=status)
+    if not (show_stats or options.report_path):
+        return
+
+    report = build_run_report(label, stats, results, slowest=options.report_slowest)
+    if show_stats:
+        log_run_report(report)
+    if options.report_path:
+        write_run_report(options.report_path, report)
+
+
+def gather_running_configs(
+    ip_list: Sequence[str | Device],
+    out_dir: Path,
+    show_stats: bool = False,
+    options: RunOptions | None = None,
+    sessions: SessionPool | None = None,
+) -> list[DeviceResult]:
+    """Connect to each device and save running configurations."""
+    log.info("RACKSCRIBE START - OPERATION RUNNING CONFIGURATIONS")
+    return _gather(
+        ip_list,
+        ["config"],
+        out_file="",
+        out_dir=out_dir,
+        show_stats=show_stats,
+        options=options,
+        operation="Gather Running Configurations",
+        label="Running-config",
+        sessions=sessions,
+    )
+
 
 def gather_serial_numbers(
-    ip_list: list[str],
+    ip_list: Sequence[str | Device],
     out_file: str,
     out_dir: Path,
     show_stats: bool = False,
-) -> None:
+    options: RunOptions | None = None,
+    sessions: SessionPool | None = None,
+) -> list[DeviceResult]:
     """Connect to each device and collect serial numbers into an inventory table."""
     log.info("RACKSCRIBE START - OPERATION GATHER INVENTORY")
+    return _gather(
+        ip_list,
+        ["inventory"],
+        out_file=out_file,
+        out_dir=out_dir,
+        show_stats=show_stats,
+        options=options,
+        operation="Gather Inventory",
+        label="Gather inventory",
+        sessions=sessions,
+    )
 
-    start = time.perf_counter()
 
-    device_number = 0
-    inventory_table: list[list[str]] = []
-    success_count = 0
-    failure_count = 0
-
-    for ip in ip_list:
-        device_number += 1
-        try:
-            if not check_ip_address(ip):
-                log.error(f"Invalid IP address: '{ip}'")
-                failure_count += 1
-                continue
-
-            log.info(f"Connecting to host {ip}")
-
-            device: Mapping[str, Any] = load_device_attr(ip)
-            hostname = get_hostname(device)
-            output = send_cmd(device, "show inventory")
-            device_inventory = process_inventory_output(hostname, output)
-
-            for item in device_inventory:
-                inventory_table.append(item)
-
-            log.info(f"Inventory information retrieved successfully from {hostname} ({ip})")
-            success_count += 1
-
-        except Exception as exc:  # noqa: BLE001
-            failure_count += 1
-            log.warning(f"No serial numbers saved for {ip}. See rackscribe.log for details.")
-            log.debug(
-                f"Exception while collecting inventory for IP address {ip}. Details: {exc}",
-                exc_info=True,
-            )
+def gather_collections(
+    ip_list: Sequence[str | Device],
+    collect: list[str],
+    out_file: str,
+    out_dir: Path,
+    show_stats: bool = False,
+    options: RunOptions | None = None,
+    sessions: SessionPool | None = None,
+) -> list[DeviceResult]:
+    """
+    Connect to each device once and run every requested collection.
 
-    write_ok = create_inventory_file(out_file, out_dir, inventory_table)
+    collect holds COLLECTIONS keys. Running configurations are written per host
+    and inventory rows are written to a single workbook at the end of the run.
+    """
+    log.info(f"RACKSCRIBE START - OPERATION COLLECT {', '.join(collect).upper()}")
+    return _gather(
+        ip_list,
+        collect,
+        out_file=out_file,
+        out_dir=out_dir,
+        show_stats=show_stats,
+        options=options,
+        operation=f"Collect {', '.join(collect)}",
+        label="Collection",
+        sessions=sessions,
+    )
 
-    elapsed = time.perf_counter() - start
 
-    if show_stats:
+def merge_shards(
+    out_file: str,
+    out_dir: Path,
+    show_stats: bool = False,
+    options: RunOptions | None = None,
+) -> None:
+    """Merge per-shard results into one inventory file and stats summary."""
+    options = options or RunOptions()
+    log.info("RACKSCRIBE START - OPERATION MERGE SHARDS")
+
+    merged = merge_shard_files(out_file, out_dir)
+    if merged is None:
+        return
+    stats, results = merged
+    if not results:
+        log.error(f"No shard results found for '{out_file}' in '{out_dir}'.")
+        return
+
+    status = None
+    if any(result.rows for result in results):
+        writer = open_inventory_file(out_file, out_dir, options.output_format)
+        for result in results:
+            writer.append(result.rows)
+        write_ok = writer.close()
         status = "Completed successfully" if write_ok else "Completed with output errors"
-        total = success_count + failure_count
-        rate = success_count / elapsed if elapsed > 0 and total > 0 else 0.0
-        log.info(
-            f"[STATS] Gather inventory operation completed in {elapsed:2f} seconds | "
-            f"{status} | "
-            f"Devices: {total} - Success: {success_count} - Failed: {failure_count} | "
-            f"Rate: {rate:.2f} seconds per device."
-        )
-    else:
-        log.debug(
-            f"Gather inventory operation elapsed time: {elapsed:.2f} seconds "
-            f"(success={success_count}, failure={failure_count})"
-        )
+
+    _report_run("Merged shards", stats, results, show_stats, options, status)
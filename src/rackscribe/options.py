@@ -0,0 +1,75 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+
+ENGINES = ("thread", "async")
+
+# Collection name -> show command. Outputs are dispatched by operations._collect_device().
+COLLECTIONS: dict[str, str] = {
+    "config": "show running-config",
+    "inventory": "show inventory",
+}
+
+
+@dataclass
+class RunOptions:
+    """Tuning options shared by all gather operations."""
+
+    # Devices collected concurrently.
+    workers: int = 1
+    # Concurrency engine, one of ENGINES.
+    engine: str = "thread"
+    # Per-device timeout in seconds (async engine only).
+    timeout: float | None = None
+    # Local processes the inventory is split across.
+    processes: int = 1
+    # (K, N) to run only shard K of N and save results for a later merge.
+    shard: tuple[int, int] | None = None
+    # Pull the config-change timestamp first and skip unchanged configs entirely.
+    probe: bool = False
+    # Rewrite every config file, ignoring the content-hash index.
+    full: bool = False
+    # Extra connection attempts per device after a transient error.
+    retries: int = 0
+    # Delay before the first retry in seconds, doubled for each further retry (with jitter).
+    retry_delay: float = 1.0
+    # Check the SSH port is open before connecting, failing dead hosts fast.
+    preflight: bool = False
+    # Seconds to wait for the preflight TCP connection.
+    preflight_timeout: float = 2.0
+    # Sweep the SSH ports of all devices first and skip the addresses that do not answer.
+    discover: bool = False
+    # Most sessions at once per concurrency group or device type, e.g. {"site-a": 20}.
+    group_limits: dict[str, int] = field(default_factory=dict)
+    # Most new connections per second across the run (0 = unlimited).
+    connect_rate: float = 0.0
+    # Skip the remaining devices after this many consecutive failures (0 = never).
+    max_failures: int = 0
+    # Only collect these IP addresses, still numbered by their place in the inventory.
+    only_hosts: list[str] | None = None
+    # Only collect devices listed in the previous run's failure list.
+    retry_failed: bool = False
+    # Skip devices already collected by an interrupted run, using its journal.
+    resume: bool = False
+    # Diff changed configs against their previous copies and write a change report.
+    diff: bool = False
+    # Read command output with commands.read_bulk() instead of netmiko's send_command().
+    bulk_read: bool = False
+    # Store configs compressed and content-addressed, a config_store.COMPRESSIONS key.
+    compression: str = "none"
+    # Inventory output format, a writers.WRITERS key.
+    output_format: str = "xlsx"
+    # Write a per-device phase timing report here (.json or .csv).
+    report_path: Path | None = None
+    # Number of slowest devices listed in the report and --stats output.
+    report_slowest: int = 10
+    # Serve inventory results younger than this many seconds from the result cache.
+    # None disables the cache.
+    max_age: float | None = None
+    # Write Prometheus metrics here at the end of the run (node_exporter textfile collector).
+    metrics_file: Path | None = None
+    # Console log level for worker processes.
+    log_level: str = "INFO"
+    # Log file format, "text" or "json" (see logging_setup.LOG_FORMATS).
+    log_format: str = "text"
+    # Write log records from a listener thread instead of the logging threads.
+    log_queue: bool = False
@@ -3,27 +3,12 @@ import re
 from datetime import datetime
 from pathlib import Path
 
-import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Font, PatternFill
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.worksheet import Worksheet
+from .config_store import config_file_name, link_config, store_config
+from .parsers import parse_inventory
+from .writers import WRITERS, InventoryWriter
 
 log = logging.getLogger("rackscribe")
 
-_INVENTORY_RE = re.compile(
-    # Regex used in process_inventory_output to get field values. Implement PID and VID if needed.
-    r"""
-        NAME:\s*"(?P<name>[^"]+)",\s*
-        DESCR:\s*"(?P<description>[^"]+)"\s*
-        PID:\s*[^,]*\s*,\s*
-        VID:\s*[^,]*\s*,\s*
-        SN:\s*(?P<sn>[^\r\n]*)
-    """,
-    re.MULTILINE | re.VERBOSE,
-)
-
-
 _IOS_PREAMBLE_RE = re.compile(
     # Regex used in remove_config_preamble to strip configuration preamble text in Cisco IOS.
     r"""
@@ -47,7 +32,7 @@ def remove_config_preamble(config: str) -> str:
 def create_config_file(hostname: str, out_dir: Path, show_run_output: str) -> bool:
     """Write running configuration to a per-host file."""
     path = out_dir / f"{hostname}.cfg"
-    log.info(f"Creating configuration file '{hostname}'")
+    log.info("Creating configuration file '%s'", hostname)
 
     try:
         path.parent.mkdir(parents=True, exist_ok=True)
@@ -56,96 +41,87 @@ def create_config_file(hostname: str, out_dir: Path, show_run_output: str) -> bo
             f.write(show_run_output)
     except OSError as exc:
         log.error(
-            f"Failed to write configuration file for {hostname} at '{path}'. See rackscribe.log for details."
+            "Failed to write configuration file for %s at '%s'. See rackscribe.log for details.",
+            hostname,
+            path,
         )
         log.debug(
-            f"Failed to write configuration file for {hostname} at '{path}': {exc}", exc_info=True
+            "Failed to write configuration file for %s at '%s': %s",
+            hostname,
+            path,
+            exc,
+            exc_info=True,
         )
         return False
 
-    log.info(f"File created for {hostname} at '{path}'")
+    log.info("File created for %s at '%s'", hostname, path)
     return True
 
 
-def process_inventory_output(hostname: str, show_inventory_output: str) -> list[list[str]]:
-    rows: list[list[str]] = []
-    for m in _INVENTORY_RE.finditer(show_inventory_output):
-        name = m.group("name")
-        description = m.group("description")
-        sn = (m.group("sn") or "").strip() or "N/A"
-        rows.append([hostname, name, description, sn])
-    return rows
-
+def create_stored_config_file(
+    name: str,
+    out_dir: Path,
+    show_run_output: str,
+    compression: str,
+) -> Path | None:
+    """
+    Save a running configuration compressed in the config store and link the per-host file to it.
 
-def format_inventory_worksheet(excel_path: str) -> None:
-    """Apply basic formatting to the inventory Excel worksheet."""
-    wb = load_workbook(excel_path)
-    ws = wb.active
+    Returns the stored object's path, or None if it could not be written.
+    """
+    path = out_dir / config_file_name(name, compression)
+    log.info("Creating configuration file '%s'", name)
 
-    if not isinstance(ws, Worksheet):
-        log.warning(
-            f"Active sheet in '{excel_path}' is not a standard worksheet. "
-            "Skipping Excel formatting."
+    try:
+        object_path = store_config(out_dir, show_run_output, compression)
+        link_config(object_path, path)
+    except OSError as exc:
+        log.error(
+            "Failed to write configuration file for %s at '%s'. See rackscribe.log for details.",
+            name,
+            path,
         )
-        return
-
-    # Freeze header row
-    ws.freeze_panes = "A2"
-
-    # Enable auto-filter
-    ws.auto_filter.ref = ws.dimensions
-
-    # Header style
-    header_fill = PatternFill("solid", fgColor="DDDDDD")
-    header_font = Font(bold=True)
+        log.debug(
+            "Failed to write configuration file for %s at '%s': %s", name, path, exc, exc_info=True
+        )
+        return None
 
-    for cell in ws[1]:
-        cell.fill = header_fill
-        cell.font = header_font
+    log.info("File created for %s at '%s'", name, path)
+    return object_path
 
-    # Auto-size columns based on max cell width
-    for col_idx, column_cells in enumerate(ws.columns, start=1):
-        max_length = 0
-        for cell in column_cells:
-            try:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            except Exception:
-                pass
 
-        adjusted_width = max_length + 2
-        ws.column_dimensions[get_column_letter(col_idx)].width = adjusted_width
+def process_inventory_output(
+    hostname: str,
+    show_inventory_output: str,
+    device_type: str | None = None,
+) -> list[list[str]]:
+    """Turn 'show inventory' output into INVENTORY_COLUMNS rows for one host."""
+    return [[hostname, *item] for item in parse_inventory(show_inventory_output, device_type)]
 
-    wb.save(excel_path)
 
+def open_inventory_file(
+    file_name: str,
+    out_dir: Path,
+    output_format: str = "xlsx",
+) -> InventoryWriter:
+    """Start a timestamped inventory file that rows can be streamed into."""
+    writer_class = WRITERS[output_format]
 
-def create_inventory_file(file_name: str, out_dir: Path, inventory: list[list[str]]) -> bool:
-    """Write the collected inventory to a timestamped Excel file."""
     now = datetime.now()
     timestamp_str = now.strftime("%Y%m%d-%H%M%S")
 
     base_name = f"{file_name}_{timestamp_str}"
-    full_path = out_dir / f"{base_name}.xlsx"
-
-    if not inventory:
-        log.warning(f"No inventory data to write. Skipping Excel file creation {full_path}.")
-        return False
-
-    TABLE_COLUMNS = ["Hostname", "Name", "Description", "Serial Number"]
-
-    try:
-        full_path.parent.mkdir(parents=True, exist_ok=True)
-
-        df = pd.DataFrame(inventory, columns=TABLE_COLUMNS)
-        df.to_excel(full_path, index=False)
-
-        # Apply formatting AFTER creation
-        format_inventory_worksheet(str(full_path))
-    except (OSError, ValueError) as exc:
-        log.error(
-            f"Failed to write inventory Excel file at '{full_path}'. See rackscribe.log for details."
-        )
-        log.debug(f"Failed to write inventory Excel file at {full_path}: {exc}", exc_info=True)
-        return False
-    log.info(f"Inventory Excel file successfully created at {full_path}")
-    return True
+    full_path = out_dir / f"{base_name}{writer_class.extension}"
+    return writer_class(full_path)
+
+
+def create_inventory_file(
+    file_name: str,
+    out_dir: Path,
+    inventory: list[list[str]],
+    output_format: str = "xlsx",
+) -> bool:
+    """Write the collected inventory to a timestamped file (Excel by default)."""
+    writer = open_inventory_file(file_name, out_dir, output_format)
+    writer.append(inventory)
+    return writer.close()
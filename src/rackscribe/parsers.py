@@ -0,0 +1,143 @@
+import functools
+import logging
+import re
+import threading
+from importlib import resources
+from typing import Any, NamedTuple
+
+log = logging.getLogger("rackscribe")
+
+
+class InventoryItem(NamedTuple):
+    """One 'show inventory' entry."""
+
+    name: str
+    description: str
+    pid: str
+    vid: str
+    sn: str
+
+
+_INVENTORY_RE = re.compile(
+    # Cisco 'show inventory' entry: NAME/DESCR line followed by the PID/VID/SN line.
+    r"""
+        NAME:\s*"(?P<name>[^"]*)",\s*
+        DESCR:\s*"(?P<description>[^"]*)"\s*
+        PID:[ \t]*(?P<pid>[^,\r\n]*),[ \t]*
+        VID:[ \t]*(?P<vid>[^,\r\n]*),[ \t]*
+        SN:[ \t]*(?P<sn>[^\r\n]*)
+    """,
+    re.VERBOSE,
+)
+
+# Netmiko device types parsed with _INVENTORY_RE, matched by prefix.
+REGEX_PLATFORMS = ("cisco_ios", "cisco_xe", "cisco_nxos", "cisco_asa", "cisco_xr")
+
+# Netmiko device type -> ntc-templates platform, where the names differ.
+_TEMPLATE_PLATFORMS = {"cisco_xe": "cisco_ios"}
+
+# TextFSM value names per InventoryItem field, in order of preference.
+_TEXTFSM_FIELDS = {
+    "name": ("NAME", "PORT"),
+    "description": ("DESCR", "DESCRIPTION"),
+    "pid": ("PID",),
+    "vid": ("VID",),
+    "sn": ("SN",),
+}
+
+
+def _or_na(value: str) -> str:
+    return value.strip() or "N/A"
+
+
+def parse_inventory_regex(output: str) -> list[InventoryItem]:
+    """Parse Cisco-style 'show inventory' output with the precompiled regex."""
+    # One findall() pass over the whole output.
+    return [
+        InventoryItem(name, description, _or_na(pid), _or_na(vid), _or_na(sn))
+        for name, description, pid, vid, sn in _INVENTORY_RE.findall(output)
+    ]
+
+
+def _template_platform(device_type: str) -> str:
+    platform = _TEMPLATE_PLATFORMS.get(device_type, device_type)
+    for suffix in ("_telnet", "_serial"):
+        platform = platform.removesuffix(suffix)
+    return platform
+
+
+@functools.cache
+def _inventory_template(platform: str) -> tuple[Any, threading.Lock] | None:
+    """
+    Compiled ntc-templates 'show inventory' template for platform, or None.
+
+    Templates are compiled once per process. TextFSM parsers keep state while
+    parsing, so each comes with a lock.
+    """
+    template = resources.files("ntc_templates") / "templates" / f"{platform}_show_inventory.textfsm"
+    if not template.is_file():
+        return None
+
+    # Imported on first use: textfsm is only needed for non-Cisco platforms.
+    import textfsm
+
+    with template.open(encoding="utf-8") as f:
+        return textfsm.TextFSM(f), threading.Lock()
+
+
+def parse_inventory_textfsm(output: str, device_type: str) -> list[InventoryItem] | None:
+    """
+    Parse 'show inventory' output with the ntc-templates template for device_type.
+
+    Returns None when there is no template for the platform.
+    """
+    compiled = _inventory_template(_template_platform(device_type))
+    if compiled is None:
+        return None
+
+    fsm, lock = compiled
+    with lock:
+        fsm.Reset()
+        records = fsm.ParseText(output)
+        header = list(fsm.header)
+
+    columns = {
+        field: next((header.index(name) for name in names if name in header), None)
+        for field, names in _TEXTFSM_FIELDS.items()
+    }
+    return [
+        InventoryItem(
+            *(
+                _or_na(str(record[index])) if index is not None else "N/A"
+                for index in columns.values()
+            )
+        )
+        for record in records
+    ]
+
+
+def parse_inventory(output: str, device_type: str | None = None) -> list[InventoryItem]:
+    """
+    Parse 'show inventory' output for the netmiko device_type (default: cisco_ios).
+
+    Cisco platforms use the precompiled regex and fall back to TextFSM when it
+    finds nothing. Other platforms use their ntc-templates template and fall
+    back to the regex when there is none.
+    """
+    device_type = device_type or "cisco_ios"
+
+    is_cisco = device_type.startswith(REGEX_PLATFORMS)
+    if is_cisco:
+        items = parse_inventory_regex(output)
+        if items or not output.strip():
+            return items
+
+    try:
+        fsm_items = parse_inventory_textfsm(output, device_type)
+    except Exception as exc:  # noqa: BLE001
+        log.debug("TextFSM inventory parsing failed for %s: %s", device_type, exc, exc_info=True)
+        fsm_items = None
+
+    if fsm_items is not None:
+        return fsm_items
+    return [] if is_cisco else parse_inventory_regex(output)
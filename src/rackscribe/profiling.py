@@ -0,0 +1,127 @@
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+log = logging.getLogger("rackscribe")
+
+# Functions listed in the hot spot summary.
+PROFILE_TOP = 20
+
+# Peak traced memory per run phase in bytes, while --profile-memory is tracing.
+# "total" is the peak of the whole profiled block.
+_memory_peaks: dict[str, int] = {}
+
+
+def _fold_peak() -> int:
+    """Fold the peak since the last reset into the total, and return it."""
+    _, peak = tracemalloc.get_traced_memory()
+    _memory_peaks["total"] = max(_memory_peaks.get("total", 0), peak)
+    return peak
+
+
+@contextmanager
+def memory_phase(name: str) -> Iterator[None]:
+    """Record the peak traced memory of a run phase. No-op unless tracemalloc is tracing."""
+    if not tracemalloc.is_tracing():
+        yield
+        return
+
+    _fold_peak()
+    tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        _memory_peaks[name] = max(_memory_peaks.get(name, 0), _fold_peak())
+
+
+class _ThreadProfiles:
+    """
+    One profiler per worker thread, for Python versions where cProfile only
+    sees the thread that enabled it (before 3.12).
+    """
+
+    def __init__(self) -> None:
+        self.profiles: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self, frame: FrameType, event: str, arg: Any) -> None:
+        # Called once per new thread. Enabling the profiler replaces this hook.
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+
+@contextmanager
+def profile_run(out_dir: Path, memory: bool = False, top: int = PROFILE_TOP) -> Iterator[None]:
+    """
+    Profile the block with cProfile, worker threads included.
+
+    The profile is saved to '<out_dir>/rackscribe-profile_<timestamp>.prof'
+    (open it with pstats or snakeviz), and the top functions by own time are
+    logged. With memory, tracemalloc also reports the peak memory of each run
+    phase. Worker processes (--processes) are not profiled.
+    """
+    threads = _ThreadProfiles() if sys.version_info < (3, 12) else None
+    if threads:
+        threading.setprofile(threads.start)
+    if memory:
+        _memory_peaks.clear()
+        tracemalloc.start()
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        if threads:
+            threading.setprofile(None)
+        if memory:
+            _fold_peak()
+            tracemalloc.stop()
+
+        text = io.StringIO()
+        stats = pstats.Stats(profile, stream=text)
+        for thread_profile in threads.profiles if threads else []:
+            stats.add(thread_profile)
+        _report_profile(out_dir, stats, text, top)
+        if memory:
+            _report_memory()
+
+
+def _report_profile(out_dir: Path, stats: pstats.Stats, text: io.StringIO, top: int) -> None:
+    path = out_dir / f"rackscribe-profile_{datetime.now():%Y%m%d-%H%M%S}.prof"
+    try:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(path)
+    except OSError as exc:
+        log.error(f"Failed to write profile at '{path}'. See rackscribe.log for details.")
+        log.debug(f"Failed to write profile at '{path}': {exc}", exc_info=True)
+    else:
+        log.info(f"Profile saved to '{path}'.")
+
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(top)
+    # Skip pstats' header lines down to the table.
+    table = text.getvalue()
+    table = table[table.find("   ncalls") :].rstrip()
+    log.info(f"[PROFILE] Top {top} functions by own time, summed over threads:\n{table}")
+
+
+def _report_memory() -> None:
+    total = _memory_peaks.pop("total", 0)
+    phases = " - ".join(f"{name}: {size / 2**20:.1f} MiB" for name, size in _memory_peaks.items())
+    log.info(
+        f"[PROFILE] Peak traced memory: {total / 2**20:.1f} MiB"
+        + (f" | {phases}" if phases else "")
+    )
@@ -0,0 +1,117 @@
+import functools
+import os
+import random
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+# DEVICE_TYPE that swaps SSH for recorded output (see README, "Offline replay").
+REPLAY_DEVICE_TYPE = "replay"
+
+_INVALID_INPUT = "% Invalid input detected at '^' marker."
+
+# Characters returned by each read_channel() call, like an SSH channel read.
+_CHUNK_SIZE = 65535
+
+
+@dataclass(frozen=True)
+class ReplaySettings:
+    """Where recorded outputs live and how the simulated devices behave."""
+
+    # Folder of recorded outputs: '<host>/<command>.txt', falling back to 'default/<command>.txt'.
+    captures: Path
+    # Seconds added to the connection and to every command.
+    latency: float = 0.0
+    # Share of connections that time out, between 0 and 1.
+    failure_rate: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> "ReplaySettings":
+        return cls(
+            captures=Path(os.getenv("REPLAY_DIR", "captures")),
+            latency=float(os.getenv("REPLAY_LATENCY", "0")),
+            failure_rate=float(os.getenv("REPLAY_FAILURE_RATE", "0")),
+        )
+
+
+def command_file_name(command: str) -> str:
+    """File name a command's output is recorded under, e.g. 'show_running-config.txt'."""
+    return re.sub(r"[^\w-]+", "_", command.strip()).strip("_") + ".txt"
+
+
+@functools.lru_cache(maxsize=256)
+def _read_capture(path: Path) -> str | None:
+    try:
+        return path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+
+
+class ReplayConnection:
+    """
+    Stand-in for a netmiko connection that serves recorded command output.
+
+    Only the calls rackscribe makes are implemented. '{hostname}' in recorded
+    output is replaced with the device's hostname. Recorded files are cached,
+    so thousands of devices can share the 'default' captures cheaply.
+    """
+
+    def __init__(self, host: str, settings: ReplaySettings | None = None, **_: Any) -> None:
+        self.host = host
+        self.settings = settings or ReplaySettings.from_env()
+        self._simulate_latency()
+        if random.random() < self.settings.failure_rate:
+            from netmiko import NetmikoTimeoutException
+
+            raise NetmikoTimeoutException(f"Simulated connection timeout to {host}.")
+
+        prompt = self._capture("prompt.txt")
+        self.prompt = prompt.strip() if prompt else f"replay-{host.replace('.', '-')}#"
+        # Output waiting to be read over the simulated channel (see read_channel()).
+        self._channel: list[str] = []
+
+    def _simulate_latency(self) -> None:
+        if self.settings.latency > 0:
+            time.sleep(self.settings.latency)
+
+    def _capture(self, file_name: str) -> str | None:
+        output = _read_capture(self.settings.captures / self.host / file_name)
+        if output is None:
+            output = _read_capture(self.settings.captures / "default" / file_name)
+        return output
+
+    def find_prompt(self) -> str:
+        return self.prompt
+
+    def enable(self) -> None:
+        """Recorded sessions are already privileged."""
+
+    def send_command(self, command: str, **_: Any) -> str:
+        self._simulate_latency()
+        output = self._capture(command_file_name(command))
+        if output is None:
+            return _INVALID_INPUT
+        return output.replace("{hostname}", self.prompt[:-1])
+
+    def normalize_cmd(self, command: str) -> str:
+        return command.rstrip() + "\n"
+
+    def write_channel(self, data: str) -> None:
+        """Answer a command written to the channel with its echo, output and the prompt."""
+        command = data.strip()
+        if not command:
+            return
+        output = self.send_command(command)
+        text = f"{command}\n{output.rstrip()}\n{self.prompt}"
+        self._channel.extend(text[i : i + _CHUNK_SIZE] for i in range(0, len(text), _CHUNK_SIZE))
+
+    def read_channel(self) -> str:
+        return self._channel.pop(0) if self._channel else ""
+
+    def is_alive(self) -> bool:
+        return True
+
+    def disconnect(self) -> None:
+        pass
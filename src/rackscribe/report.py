@@ -0,0 +1,137 @@
+import csv
+import json
+import logging
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from .stats import PHASES, DeviceResult, RunStats
+
+log = logging.getLogger("rackscribe")
+
+PERCENTILES = (50, 90, 95, 99)
+
+REPORT_FORMATS = (".json", ".csv")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Linear-interpolated percentile of an ascending list. 0.0 for an empty list."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    """Count, total, mean, percentiles and max of a list of durations."""
+    ordered = sorted(values)
+    summary: dict[str, float] = {
+        "count": len(ordered),
+        "total": sum(ordered),
+        "mean": sum(ordered) / len(ordered) if ordered else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}"] = percentile(ordered, pct)
+    summary["max"] = ordered[-1] if ordered else 0.0
+    return summary
+
+
+def _device_row(result: DeviceResult) -> dict[str, Any]:
+    row: dict[str, Any] = {
+        "device_number": result.device_number,
+        "ip": result.ip,
+        "hostname": result.hostname,
+        "ok": result.ok,
+        "cached": result.cached,
+        "seconds": round(result.seconds, 4),
+    }
+    for phase in PHASES:
+        row[phase] = round(result.phases.get(phase, 0.0), 4)
+    return row
+
+
+def build_run_report(
+    label: str,
+    stats: RunStats,
+    results: list[DeviceResult],
+    slowest: int = 10,
+) -> dict[str, Any]:
+    """
+    Summarise a run: totals, per-phase percentiles and the slowest devices.
+
+    Timings only cover devices actually contacted, not those served from the result cache.
+    """
+    collected = [result for result in results if not result.cached]
+    phase_values: dict[str, list[float]] = {phase: [] for phase in PHASES}
+    for result in collected:
+        for phase, seconds in result.phases.items():
+            phase_values.setdefault(phase, []).append(seconds)
+
+    slowest_results = sorted(collected, key=lambda result: result.seconds, reverse=True)[:slowest]
+    rate = stats.success_count / stats.elapsed if stats.elapsed > 0 else 0.0
+
+    return {
+        "operation": label,
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "summary": {**asdict(stats), "devices_per_second": rate},
+        "device_seconds": summarize([result.seconds for result in collected]),
+        "phases": {phase: summarize(values) for phase, values in phase_values.items()},
+        "slowest": [_device_row(result) for result in slowest_results],
+        "devices": [_device_row(result) for result in results],
+    }
+
+
+def write_run_report(path: Path, report: dict[str, Any]) -> bool:
+    """
+    Write a run report built by build_run_report().
+
+    '.json' files get the full report. '.csv' files get one row per device
+    with per-phase seconds, ready for a spreadsheet or pandas.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix.lower() == ".csv":
+            with path.open("w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(
+                    f,
+                    fieldnames=[
+                        "device_number",
+                        "ip",
+                        "hostname",
+                        "ok",
+                        "cached",
+                        "seconds",
+                        *PHASES,
+                    ],
+                )
+                writer.writeheader()
+                writer.writerows(report["devices"])
+        else:
+            with path.open("w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    except OSError as exc:
+        log.error(f"Failed to write run report at '{path}'. See rackscribe.log for details.")
+        log.debug(f"Failed to write run report at '{path}': {exc}", exc_info=True)
+        return False
+
+    log.info(f"Run report written to '{path}'")
+    return True
+
+
+def log_run_report(report: dict[str, Any]) -> None:
+    """Log per-phase percentiles and the slowest devices."""
+    for phase, summary in report["phases"].items():
+        if not summary["count"]:
+            continue
+        log.info(
+            f"[STATS] Phase {phase:<9} p50: {summary['p50']:.2f}s - p90: {summary['p90']:.2f}s - "
+            f"p99: {summary['p99']:.2f}s - max: {summary['max']:.2f}s"
+        )
+    for row in report["slowest"]:
+        log.info(
+            f"[STATS] Slow device {row['ip']} ({row['hostname'] or 'unknown'}): "
+            f"{row['seconds']:.2f}s"
+        )
@@ -0,0 +1,132 @@
+import json
+import logging
+import sqlite3
+import time
+import zlib
+from collections.abc import Iterable
+from contextlib import closing
+from pathlib import Path
+from typing import NamedTuple
+
+log = logging.getLogger("rackscribe")
+
+CACHE_FILE_NAME = ".rackscribe-cache.sqlite"
+
+# Bumped when the table layout changes. An older cache is dropped and rebuilt.
+_SCHEMA_VERSION = 2
+
+# Entries not refreshed for this long are deleted.
+CACHE_RETENTION = 30 * 86400.0
+
+# Each entry counts as fresh for between this fraction of --max-age and --max-age
+# itself, so devices collected in the same run expire over a spread of later runs
+# instead of all at once.
+_TTL_SPREAD = 0.5
+
+
+class CachedResult(NamedTuple):
+    """Parsed collection output of one host, as kept in the cache."""
+
+    ip: str
+    hostname: str
+    # Device type it was parsed for. A different type means the entry is stale.
+    device_type: str
+    rows: list[list[str]]
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+        conn.execute("DROP TABLE IF EXISTS results")
+        conn.execute(
+            """
+            CREATE TABLE results (
+                host TEXT NOT NULL,
+                collection TEXT NOT NULL,
+                hostname TEXT NOT NULL,
+                device_type TEXT NOT NULL,
+                rows TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (host, collection)
+            )
+            """
+        )
+        conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        conn.commit()
+    return conn
+
+
+def load_cached_results(
+    out_dir: Path,
+    collection: str,
+    device_types: dict[str, str],
+    max_age: float,
+) -> dict[str, CachedResult]:
+    """
+    Fresh cache entries of a collection for the hosts in device_types (ip -> device type).
+
+    An entry is fresh when it is younger than its host's share of max_age
+    (see _ttl()) and was parsed for the host's current device type. Returns an
+    empty dict when the cache is missing or unreadable.
+    """
+    path = out_dir / CACHE_FILE_NAME
+    if max_age <= 0 or not path.exists():
+        return {}
+
+    now = time.time()
+    fresh: dict[str, CachedResult] = {}
+    try:
+        with closing(_connect(path)) as conn:
+            # One query for the whole inventory rather than one per device.
+            cursor = conn.execute(
+                "SELECT host, hostname, device_type, rows, fetched_at FROM results "
+                "WHERE collection = ? AND fetched_at > ?",
+                (collection, now - max_age),
+            )
+            for ip, hostname, device_type, rows, fetched_at in cursor:
+                if device_types.get(ip) == device_type and now - fetched_at < _ttl(ip, max_age):
+                    fresh[ip] = CachedResult(ip, hostname, device_type, json.loads(rows))
+    except (sqlite3.Error, ValueError) as exc:
+        log.warning(f"Ignoring unreadable result cache at '{path}'. All devices will be collected.")
+        log.debug(f"Failed to read result cache at '{path}': {exc}", exc_info=True)
+        return {}
+
+    return fresh
+
+
+def _ttl(ip: str, max_age: float) -> float:
+    """
+    How long a host's entry stays fresh: a fixed fraction of max_age per host.
+
+    Judged when reading, so the max_age of the run that wrote an entry does not matter.
+    """
+    spread = zlib.crc32(ip.encode("utf-8")) / 0xFFFFFFFF
+    return max_age * (_TTL_SPREAD + (1 - _TTL_SPREAD) * spread)
+
+
+def save_cached_results(out_dir: Path, collection: str, entries: Iterable[CachedResult]) -> bool:
+    """Store freshly collected results and delete entries past CACHE_RETENTION."""
+    path = out_dir / CACHE_FILE_NAME
+    now = time.time()
+    records = [
+        (
+            entry.ip,
+            collection,
+            entry.hostname,
+            entry.device_type,
+            json.dumps(entry.rows, separators=(",", ":")),
+            now,
+        )
+        for entry in entries
+    ]
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(_connect(path)) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", records)
+            conn.execute("DELETE FROM results WHERE fetched_at < ?", (now - CACHE_RETENTION,))
+    except (OSError, sqlite3.Error) as exc:
+        log.error(f"Failed to write result cache at '{path}'. See rackscribe.log for details.")
+        log.debug(f"Failed to write result cache at '{path}': {exc}", exc_info=True)
+        return False
+
+    return True
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import random
+import socket
+import threading
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import yaml
+
+log = logging.getLogger("rackscribe")
+
+# Failed devices of the last run, in inventory file format (see --retry-failed).
+FAILURES_FILE_NAME = "failed-devices.yaml"
+
+SSH_PORT = 22
+
+# Port probes in flight at once during a discovery sweep, kept below the usual
+# limit of 1024 open files.
+DISCOVERY_CONCURRENCY = 512
+# Seconds a discovery probe waits for the port to answer.
+DISCOVERY_TIMEOUT = 1.0
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how long to wait before retrying a device after a transient error."""
+
+    # Extra attempts after the first one.
+    retries: int = 0
+    # Delay before the first retry, doubled for every retry after that.
+    base_delay: float = 1.0
+    # Upper bound for a single delay.
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int) -> float:
+        """
+        Seconds to wait after failed attempt number attempt (1-based).
+
+        Uses exponential backoff with full jitter, so devices that dropped at
+        the same time do not all reconnect at the same time.
+        """
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+
+def tcp_reachable(host: str, port: int = SSH_PORT, timeout: float = 2.0) -> bool:
+    """True when a TCP connection to host:port opens within timeout seconds."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def discover_reachable(
+    targets: Iterable[tuple[str, int]],
+    timeout: float = DISCOVERY_TIMEOUT,
+    concurrency: int = DISCOVERY_CONCURRENCY,
+) -> set[str]:
+    """
+    Probe many (host, port) targets concurrently and return the hosts that answered.
+
+    One event loop drives up to concurrency TCP connects at a time, so sweeping
+    a whole subnet of mostly unused addresses takes seconds rather than a
+    thread and a timeout per address.
+    """
+    return asyncio.run(_sweep(iter(targets), timeout, concurrency))
+
+
+async def _sweep(targets: Iterator[tuple[str, int]], timeout: float, concurrency: int) -> set[str]:
+    reachable: set[str] = set()
+
+    async def worker() -> None:
+        # Workers share one iterator, so targets are never all materialized.
+        for host, port in targets:
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+            except (OSError, TimeoutError):
+                continue
+            writer.close()
+            reachable.add(host)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return reachable
+
+
+class CircuitBreaker:
+    """
+    Stop a run after too many consecutive device failures.
+
+    Once threshold devices in a row have failed, the breaker opens and the
+    remaining devices are skipped, e.g. when the jump host or credentials are
+    broken. A threshold of 0 disables the breaker. Thread-safe.
+    """
+
+    def __init__(self, threshold: int = 0) -> None:
+        self.threshold = threshold
+        self.consecutive_failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return bool(self.threshold) and self.consecutive_failures >= self.threshold
+
+    def record(self, ok: bool) -> None:
+        """Record one finished device."""
+        with self._lock:
+            if ok:
+                self.consecutive_failures = 0
+                return
+            self.consecutive_failures += 1
+            if self.consecutive_failures == self.threshold:
+                log.error(
+                    f"{self.threshold} consecutive devices failed. Skipping the remaining devices."
+                )
+
+
+def load_failures(out_dir: Path) -> set[str]:
+    """IP addresses that failed in the previous run. Empty when there is no failure list."""
+    path = out_dir / FAILURES_FILE_NAME
+    try:
+        with path.open(encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+    except FileNotFoundError:
+        return set()
+    except (OSError, yaml.YAMLError) as exc:
+        log.warning(f"Ignoring unreadable failure list at '{path}'.")
+        log.debug(f"Failed to read failure list at '{path}': {exc}", exc_info=True)
+        return set()
+
+    if not isinstance(data, dict) or not isinstance(data.get("inventory"), list):
+        return set()
+    return {str(ip) for ip in data["inventory"]}
+
+
+def save_failures(out_dir: Path, attempted: Iterable[str], failed: Iterable[str]) -> bool:
+    """
+    Update the failure list in out_dir.
+
+    Devices attempted in this run are replaced by this run's outcome, others
+    are kept, so shards and --retry-failed runs only update their own devices.
+    The file is a regular inventory file and also works with -i.
+    """
+    path = out_dir / FAILURES_FILE_NAME
+    failures = (load_failures(out_dir) - set(attempted)) | set(failed)
+
+    try:
+        if not failures:
+            path.unlink(missing_ok=True)
+            return True
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            yaml.safe_dump({"inventory": sorted(failures)}, f)
+    except OSError as exc:
+        log.error(f"Failed to write failure list at '{path}'. See rackscribe.log for details.")
+        log.debug(f"Failed to write failure list at '{path}': {exc}", exc_info=True)
+        return False
+
+    log.info(f"{len(failures)} failed device(s) saved to '{path}'. Use --retry-failed to retry.")
+    return True
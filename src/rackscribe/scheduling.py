@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+
+from .inventory import Device, NumberedDevices
+from .stats import DeviceResult
+
+log = logging.getLogger("rackscribe")
+
+# Seconds each device took in previous runs, used to start slow devices first.
+DURATIONS_FILE_NAME = ".rackscribe-durations.json"
+
+# How far, per worker, start_order() may move a device from its inventory position.
+# Inventory rows are written in inventory order, so every device started ahead of
+# its turn holds its rows in memory until the devices before it have finished.
+ORDER_WINDOW_PER_WORKER = 4
+
+
+def parse_limits(value: str) -> dict[str, int]:
+    """Parse comma-separated 'NAME=N' session caps. Raises ValueError if malformed."""
+    limits: dict[str, int] = {}
+    for item in (part.strip() for part in value.split(",")):
+        name, sep, count = item.partition("=")
+        try:
+            limit = int(count)
+        except ValueError:
+            limit = 0
+        if not sep or not name.strip() or limit < 1:
+            raise ValueError(f"Invalid limit '{item}'. Use NAME=N with N of 1 or greater.")
+        limits[name.strip()] = limit
+    return limits
+
+
+def device_limit_keys(device: Device) -> tuple[str, ...]:
+    """Names a device's session caps are looked up by: its concurrency group and platform."""
+    platform = device.device_type or os.getenv("DEVICE_TYPE")
+    return tuple(key for key in (device.concurrency_group, platform) if key)
+
+
+class GroupLimits:
+    """
+    Session caps per concurrency group or platform (device type).
+
+    A device only starts when every cap it falls under has a free slot. Not
+    thread-safe: slots are taken and released by the dispatching thread.
+    """
+
+    def __init__(self, caps: Mapping[str, int], inventory: Mapping[str, Device]) -> None:
+        self.caps = dict(caps)
+        self.inventory = inventory
+        self.active = dict.fromkeys(self.caps, 0)
+
+    def keys(self, ip: str) -> tuple[str, ...]:
+        """Caps that apply to a device."""
+        device = self.inventory.get(ip) or Device(ip)
+        return tuple(key for key in device_limit_keys(device) if key in self.caps)
+
+    def has_room(self, keys: tuple[str, ...]) -> bool:
+        return all(self.active[key] < self.caps[key] for key in keys)
+
+    def acquire(self, keys: tuple[str, ...]) -> None:
+        for key in keys:
+            self.active[key] += 1
+
+    def release(self, keys: tuple[str, ...]) -> None:
+        for key in keys:
+            self.active[key] -= 1
+
+
+class DeviceQueue:
+    """
+    Devices waiting to start, in start order, holding back those at a cap.
+
+    Devices are kept in one lane per combination of caps, so finding the next
+    device that may start only looks at the head of each lane.
+    """
+
+    def __init__(self, devices: NumberedDevices, limits: GroupLimits | None = None) -> None:
+        self.limits = limits
+        self._lanes: dict[tuple[str, ...], deque[tuple[int, int, str]]] = {}
+        self._keys: dict[str, tuple[str, ...]] = {}
+        for rank, (device_number, ip) in enumerate(devices):
+            keys = limits.keys(ip) if limits else ()
+            self._keys[ip] = keys
+            self._lanes.setdefault(keys, deque()).append((rank, device_number, ip))
+        self._waiting = len(devices)
+
+    def __len__(self) -> int:
+        return self._waiting
+
+    def pop_ready(self) -> tuple[int, str] | None:
+        """Take the earliest device whose caps all have room, or None if every lane is full."""
+        best: tuple[int, int, str] | None = None
+        best_keys: tuple[str, ...] = ()
+        for keys, lane in self._lanes.items():
+            if lane and (best is None or lane[0][0] < best[0]):
+                if self.limits is None or self.limits.has_room(keys):
+                    best, best_keys = lane[0], keys
+        if best is None:
+            return None
+
+        self._lanes[best_keys].popleft()
+        self._waiting -= 1
+        if self.limits:
+            self.limits.acquire(best_keys)
+        return best[1], best[2]
+
+    def release(self, ip: str) -> None:
+        """Free the slots of a finished device."""
+        if self.limits:
+            self.limits.release(self._keys[ip])
+
+
+class RateLimiter:
+    """Spaces new connections out to at most rate per second, across threads."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def start_order(
+    devices: NumberedDevices,
+    inventory: Mapping[str, Device],
+    caps: Mapping[str, int],
+    durations: Mapping[str, float],
+    window: int | None = None,
+) -> NumberedDevices:
+    """
+    Order devices so the longest work starts first, to shorten the whole run.
+
+    A device's weight is the larger of its expected duration and the expected
+    duration of its busiest capped group (total time over the cap). Durations
+    come from previous runs; unknown devices are assumed to take the median.
+    Ties keep inventory order. With window, devices are only reordered within
+    consecutive runs of window devices, so none starts far from its turn.
+    """
+    known = [durations[ip] for _, ip in devices if ip in durations]
+    if not known and not caps:
+        return devices
+    default = statistics.median(known) if known else 1.0
+    expected = {ip: durations.get(ip, default) for _, ip in devices}
+
+    keys = {ip: device_limit_keys(inventory.get(ip) or Device(ip)) for _, ip in devices}
+    group_seconds: dict[str, float] = {}
+    for ip, device_keys in keys.items():
+        for key in device_keys:
+            if key in caps:
+                group_seconds[key] = group_seconds.get(key, 0.0) + expected[ip]
+
+    def weight(device: tuple[int, str]) -> tuple[float, float]:
+        ip = device[1]
+        group_load = max(
+            (group_seconds[key] / caps[key] for key in keys[ip] if key in caps),
+            default=0.0,
+        )
+        return max(group_load, expected[ip]), expected[ip]
+
+    if window is None:
+        return sorted(devices, key=weight, reverse=True)
+    ordered: NumberedDevices = []
+    for offset in range(0, len(devices), window):
+        ordered += sorted(devices[offset : offset + window], key=weight, reverse=True)
+    return ordered
+
+
+def load_durations(out_dir: Path) -> dict[str, float]:
+    """Per-device seconds from previous runs in out_dir. Empty if missing or unreadable."""
+    path = out_dir / DURATIONS_FILE_NAME
+    try:
+        with path.open(encoding="utf-8") as f:
+            durations = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc:
+        log.warning(f"Ignoring unreadable device durations at '{path}'.")
+        log.debug(f"Failed to read device durations at '{path}': {exc}", exc_info=True)
+        return {}
+
+    if not isinstance(durations, dict):
+        return {}
+    return {
+        str(ip): float(seconds)
+        for ip, seconds in durations.items()
+        if isinstance(seconds, int | float)
+    }
+
+
+def save_durations(out_dir: Path, results: Iterable[DeviceResult]) -> bool:
+    """Record how long each device took in this run, keeping other devices' durations."""
+    updates = {result.ip: round(result.seconds, 3) for result in results if result.seconds > 0}
+    if not updates:
+        return True
+
+    path = out_dir / DURATIONS_FILE_NAME
+    durations = load_durations(out_dir)
+    durations.update(updates)
+
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(durations, f, indent=1, sort_keys=True)
+        tmp_path.replace(path)
+    except OSError as exc:
+        log.error(f"Failed to write device durations at '{path}'. See rackscribe.log for details.")
+        log.debug(f"Failed to write device durations at '{path}': {exc}", exc_info=True)
+        return False
+
+    return True
@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from .connection import open_connection
+from .stats import timed_phase
+
+if TYPE_CHECKING:
+    from netmiko import BaseConnection
+
+log = logging.getLogger("rackscribe")
+
+
+def session_key(params: Mapping[str, Any]) -> tuple[str, ...]:
+    """Sessions are shared by connections to the same host, port, platform and user."""
+    return tuple(
+        str(params.get(name) or "") for name in ("host", "port", "device_type", "username")
+    )
+
+
+@dataclass
+class _Slot:
+    """One host's session. The lock lets a single caller use it at a time."""
+
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    conn: "BaseConnection | None" = None
+    enabled: bool = False
+    last_used: float = 0.0
+
+
+class SessionPool:
+    """
+    Warm device sessions kept open between collections (see README, "Daemon mode").
+
+    At most one session is kept per host. A session is health-checked before it
+    is reused, dropped after any error while in use, and closed once idle for
+    idle_timeout seconds. When more than max_sessions are open, the least
+    recently used idle sessions are closed.
+    """
+
+    def __init__(self, idle_timeout: float = 300.0, max_sessions: int = 1000) -> None:
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.opened = 0
+        self.reused = 0
+        self._slots: dict[tuple[str, ...], _Slot] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(1 for slot in self._slots.values() if slot.conn is not None)
+
+    def _slot(self, key: tuple[str, ...]) -> _Slot:
+        with self._lock:
+            return self._slots.setdefault(key, _Slot())
+
+    @contextmanager
+    def connection(
+        self,
+        params: Mapping[str, Any],
+        use_enable: bool,
+        phases: dict[str, float] | None = None,
+    ) -> Iterator["BaseConnection"]:
+        """Check out the host's session, opening a new one when there is no healthy one."""
+        slot = self._slot(session_key(params))
+        with slot.lock:
+            if slot.conn is not None and not self._is_usable(slot):
+                self._close(slot)
+
+            if slot.conn is None:
+                with timed_phase(phases, "connect"):
+                    slot.conn = open_connection(params)
+                slot.enabled = False
+                with self._lock:
+                    self.opened += 1
+            else:
+                with self._lock:
+                    self.reused += 1
+
+            try:
+                if use_enable and not slot.enabled:
+                    with timed_phase(phases, "enable"):
+                        slot.conn.enable()
+                    slot.enabled = True
+                yield slot.conn
+            except BaseException:
+                # The session may be left mid-command or dropped. Never reuse it.
+                self._close(slot)
+                raise
+            finally:
+                slot.last_used = time.monotonic()
+
+        self._evict_over_limit()
+
+    def _is_usable(self, slot: _Slot) -> bool:
+        if time.monotonic() - slot.last_used > self.idle_timeout:
+            return False
+        try:
+            return bool(slot.conn is not None and slot.conn.is_alive())
+        except Exception:
+            return False
+
+    def _close(self, slot: _Slot) -> None:
+        conn, slot.conn, slot.enabled = slot.conn, None, False
+        if conn is None:
+            return
+        try:
+            conn.disconnect()
+        except Exception as exc:
+            log.debug("Disconnect of pooled session failed: %s", exc, exc_info=True)
+
+    def _evict_over_limit(self) -> None:
+        with self._lock:
+            open_slots = [slot for slot in self._slots.values() if slot.conn is not None]
+            excess = len(open_slots) - self.max_sessions
+            open_slots.sort(key=lambda slot: slot.last_used)
+        # Sessions in use are skipped; they count again once returned.
+        for slot in open_slots[: max(excess, 0)]:
+            if slot.lock.acquire(blocking=False):
+                try:
+                    self._close(slot)
+                finally:
+                    slot.lock.release()
+
+    def prune(self) -> int:
+        """Close idle sessions that timed out or failed their health check. Returns how many."""
+        with self._lock:
+            slots = list(self._slots.values())
+        closed = 0
+        for slot in slots:
+            # Sessions in use are checked when they are next checked out.
+            if not slot.lock.acquire(blocking=False):
+                continue
+            try:
+                if slot.conn is not None and not self._is_usable(slot):
+                    self._close(slot)
+                    closed += 1
+            finally:
+                slot.lock.release()
+        return closed
+
+    def close(self) -> None:
+        """Close every session, waiting for sessions in use."""
+        with self._lock:
+            slots = list(self._slots.values())
+            self._slots.clear()
+        for slot in slots:
+            with slot.lock:
+                self._close(slot)
@@ -0,0 +1,118 @@
+import json
+import logging
+import re
+from dataclasses import asdict
+from pathlib import Path
+
+from .inventory import NumberedDevices
+from .stats import DeviceResult, RunStats
+
+log = logging.getLogger("rackscribe")
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse a 'K/N' shard spec. Raises ValueError if it is malformed."""
+    try:
+        index_str, count_str = value.split("/")
+        index, count = int(index_str), int(count_str)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{value}'. Use K/N, e.g. 1/4.") from None
+
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{value}'. K must be between 1 and N.")
+    return index, count
+
+
+def shard_devices(devices: NumberedDevices, index: int, count: int) -> NumberedDevices:
+    """Return shard index (1-based) of count, assigning devices round-robin."""
+    return devices[index - 1 :: count]
+
+
+def shard_file_path(out_file: str, out_dir: Path, index: int, count: int) -> Path:
+    return out_dir / f"{out_file}.shard-{index}-of-{count}.json"
+
+
+def write_shard_file(
+    path: Path,
+    index: int,
+    count: int,
+    stats: RunStats,
+    results: list[DeviceResult],
+) -> bool:
+    """Write per-shard stats and device results for a later merge."""
+    data = {
+        "shard": index,
+        "count": count,
+        "stats": asdict(stats),
+        "devices": [asdict(result) for result in results],
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(data, f)
+    except OSError as exc:
+        log.error(f"Failed to write shard file at '{path}'. See rackscribe.log for details.")
+        log.debug(f"Failed to write shard file at '{path}': {exc}", exc_info=True)
+        return False
+
+    log.info(f"Shard {index}/{count} results written to '{path}'")
+    return True
+
+
+def merge_shard_files(out_file: str, out_dir: Path) -> tuple[RunStats, list[DeviceResult]] | None:
+    """
+    Combine the '<out_file>.shard-K-of-N.json' files in out_dir.
+
+    Device results are returned in inventory order. Counters and device time
+    are summed, while elapsed time is the slowest shard, since shards run
+    side by side. Returns None, after logging why, when the files come from
+    runs with different shard counts or a shard file is missing or unreadable.
+    """
+    pattern = re.compile(rf"{re.escape(out_file)}\.shard-(\d+)-of-(\d+)\.json")
+    paths: dict[int, dict[int, Path]] = {}
+    for path in out_dir.glob(f"{out_file}.shard-*-of-*.json"):
+        match = pattern.fullmatch(path.name)
+        if match:
+            index, count = int(match[1]), int(match[2])
+            paths.setdefault(count, {})[index] = path
+
+    stats = RunStats(workers=0)
+    results: list[DeviceResult] = []
+    if not paths:
+        return stats, results
+    if len(paths) > 1:
+        counts = ", ".join(str(count) for count in sorted(paths))
+        log.error(
+            f"Shard files in '{out_dir}' come from runs with different shard counts ({counts}). "
+            "Remove the files of the stale runs and merge again."
+        )
+        return None
+
+    count, shards = next(iter(paths.items()))
+    missing = sorted(set(range(1, count + 1)) - set(shards))
+    if missing:
+        log.error(f"Missing shard file(s) for shard(s) {missing} of {count}. Nothing merged.")
+        return None
+
+    for index in range(1, count + 1):
+        path = shards[index]
+        try:
+            with path.open(encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as exc:
+            log.error(f"Unreadable shard file '{path}'. See rackscribe.log for details.")
+            log.debug(f"Failed to read shard file '{path}': {exc}", exc_info=True)
+            return None
+
+        shard_stats = RunStats(**data["stats"])
+        stats.elapsed = max(stats.elapsed, shard_stats.elapsed)
+        stats.workers += shard_stats.workers
+        stats.engine = shard_stats.engine
+
+        for device in data["devices"]:
+            result = DeviceResult(**device)
+            stats.record(result)
+            results.append(result)
+
+    results.sort(key=lambda result: result.device_number)
+    return stats, results
@@ -0,0 +1,116 @@
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+log = logging.getLogger("rackscribe")
+
+# Per-device phases, in the order they happen.
+PHASES = ("preflight", "connect", "enable", "prompt", "command", "parse", "write")
+
+
+@contextmanager
+def timed_phase(phases: dict[str, float] | None, name: str) -> Iterator[None]:
+    """Add the time spent in the block to phases[name]. No-op when phases is None."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+@dataclass
+class DeviceResult:
+    """Outcome of collecting from one device."""
+
+    device_number: int
+    ip: str
+    ok: bool = False
+    seconds: float = 0.0
+    hostname: str = ""
+    # Connection attempts made, including retries.
+    attempts: int = 0
+    # Seconds spent per phase, keyed by PHASES names.
+    phases: dict[str, float] = field(default_factory=dict)
+    rows: list[list[str]] = field(default_factory=list)
+    # Running-config only: whether the content changed, and its config index entry.
+    config_changed: bool | None = None
+    config_entry: dict[str, Any] | None = None
+    # Bytes of running configuration pulled from the device.
+    config_bytes: int = 0
+    # Served from the result cache (--max-age) instead of the device.
+    cached: bool = False
+    # With --diff: the previous copy of a changed config, relative to the output folder.
+    previous_config: str | None = None
+
+
+@dataclass
+class RunStats:
+    """Success/failure counters and timings for one collection run."""
+
+    success_count: int = 0
+    failure_count: int = 0
+    device_seconds: float = 0.0
+    elapsed: float = 0.0
+    workers: int = 1
+    engine: str = "thread"
+    changed_count: int = 0
+    unchanged_count: int = 0
+    retry_count: int = 0
+    cached_count: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.success_count + self.failure_count
+
+    def record(self, result: DeviceResult) -> None:
+        """Add one finished device to the counters."""
+        if result.ok:
+            self.success_count += 1
+        else:
+            self.failure_count += 1
+        self.device_seconds += result.seconds
+        self.retry_count += max(result.attempts - 1, 0)
+        if result.cached:
+            self.cached_count += 1
+        if result.config_changed is True:
+            self.changed_count += 1
+        elif result.config_changed is False:
+            self.unchanged_count += 1
+
+    def report(self, label: str, show_stats: bool, status: str | None = None) -> None:
+        """Log the run summary, at INFO with --stats or DEBUG otherwise."""
+        if show_stats:
+            rate = self.success_count / self.elapsed if self.elapsed > 0 and self.total > 0 else 0.0
+            speedup = self.device_seconds / self.elapsed if self.elapsed > 0 else 0.0
+            status_part = f"{status} | " if status else ""
+            configs_part = (
+                f"Configs changed: {self.changed_count} - Unchanged: {self.unchanged_count} | "
+                if self.changed_count or self.unchanged_count
+                else ""
+            )
+            retries_part = f"Retries: {self.retry_count} | " if self.retry_count else ""
+            cached_part = f"From cache: {self.cached_count} | " if self.cached_count else ""
+            log.info(
+                f"[STATS] {label} operation completed in {self.elapsed:.2f} seconds | "
+                f"{status_part}"
+                f"Devices: {self.total} - Success: {self.success_count} - "
+                f"Failed: {self.failure_count} | "
+                f"{configs_part}"
+                f"{retries_part}"
+                f"{cached_part}"
+                f"Workers: {self.workers} ({self.engine}) - Summed device time: {self.device_seconds:.2f} seconds - "
+                f"Speedup: {speedup:.2f}x | "
+                f"Rate: {rate:.2f} devices per second."
+            )
+        else:
+            log.debug(
+                f"{label} operation elapsed time: {self.elapsed:.2f} seconds "
+                f"(success={self.success_count}, failure={self.failure_count}, "
+                f"changed={self.changed_count}, unchanged={self.unchanged_count}, "
+                f"retries={self.retry_count}, cached={self.cached_count}, "
+                f"device_time={self.device_seconds:.2f})"
+            )
@@ -0,0 +1,276 @@
+import csv
+import importlib.util
+import json
+import logging
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, TextIO
+
+log = logging.getLogger("rackscribe")
+
+INVENTORY_COLUMNS = ["Hostname", "Name", "Description", "PID", "VID", "Serial Number"]
+
+
+class InventoryWriter(ABC):
+    """
+    Base class for streaming inventory writers.
+
+    Rows are handed to append() as devices finish and close() finalises the
+    file. Subclasses implement _write() and _finish(), and may override _cleanup().
+    """
+
+    extension = ""
+    label = ""
+
+    def __init__(self, path: Path, columns: list[str] = INVENTORY_COLUMNS) -> None:
+        self.path = path
+        self.columns = columns
+        self.row_count = 0
+
+    def append(self, rows: list[list[str]]) -> None:
+        """Add rows to the file."""
+        if not rows:
+            return
+        self._write(rows)
+        self.row_count += len(rows)
+
+    def close(self) -> bool:
+        """Finalise the file. Returns False when there is nothing to write or writing fails."""
+        try:
+            if not self.row_count:
+                log.warning(
+                    f"No inventory data to write. Skipping {self.label} file creation {self.path}."
+                )
+                return False
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._finish()
+        except (OSError, ValueError) as exc:
+            log.error(
+                f"Failed to write inventory {self.label} file at '{self.path}'. "
+                "See rackscribe.log for details."
+            )
+            log.debug(
+                f"Failed to write inventory {self.label} file at {self.path}: {exc}",
+                exc_info=True,
+            )
+            return False
+        finally:
+            self._cleanup()
+
+        log.info(f"Inventory {self.label} file successfully created at {self.path}")
+        return True
+
+    @abstractmethod
+    def _write(self, rows: list[list[str]]) -> None:
+        """Add rows to the file, or buffer them until _finish()."""
+
+    @abstractmethod
+    def _finish(self) -> None:
+        """Complete the file at self.path."""
+
+    def _cleanup(self) -> None:  # noqa: B027 - optional hook
+        """Release resources. Called after close(), whether it succeeded or not."""
+
+
+class _PartFileWriter(InventoryWriter):
+    """Writer that streams into '<path>.part' and renames it on close."""
+
+    def __init__(self, path: Path, columns: list[str] = INVENTORY_COLUMNS) -> None:
+        super().__init__(path, columns)
+        self.part_path = path.with_name(f"{path.name}.part")
+        self._file: TextIO | None = None
+
+    def _open(self) -> TextIO:
+        if self._file is None:
+            self.part_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.part_path.open("w", newline="", encoding="utf-8")
+            self._start(self._file)
+        return self._file
+
+    def _start(self, f: TextIO) -> None:
+        """Write any header once the file is opened."""
+
+    def _finish(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.part_path.replace(self.path)
+
+    def _cleanup(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.part_path.unlink(missing_ok=True)
+
+
+class CsvInventoryWriter(_PartFileWriter):
+    """Stream inventory rows into a CSV file with a header row."""
+
+    extension = ".csv"
+    label = "CSV"
+
+    def _start(self, f: TextIO) -> None:
+        csv.writer(f).writerow(self.columns)
+
+    def _write(self, rows: list[list[str]]) -> None:
+        csv.writer(self._open()).writerows(rows)
+
+
+class JsonLinesInventoryWriter(_PartFileWriter):
+    """Stream inventory rows into a JSON Lines file, one object per row keyed by column."""
+
+    extension = ".jsonl"
+    label = "JSON Lines"
+
+    def _write(self, rows: list[list[str]]) -> None:
+        f = self._open()
+        for row in rows:
+            f.write(json.dumps(dict(zip(self.columns, row, strict=True))))
+            f.write("\n")
+
+
+class ParquetInventoryWriter(InventoryWriter):
+    """
+    Stream inventory rows into a Parquet file. Requires pyarrow.
+
+    Rows are buffered and written as one row group per batch_size rows.
+    """
+
+    extension = ".parquet"
+    label = "Parquet"
+    batch_size = 50_000
+
+    def __init__(self, path: Path, columns: list[str] = INVENTORY_COLUMNS) -> None:
+        super().__init__(path, columns)
+        self.part_path = path.with_name(f"{path.name}.part")
+        self._batch: list[list[str]] = []
+        self._writer: Any = None
+
+    def _write(self, rows: list[list[str]]) -> None:
+        self._batch.extend(rows)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        # Imported on first use: pyarrow is optional and slow to import.
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = zip(*self._batch, strict=True)
+        table = pa.table(
+            {
+                name: pa.array(values, type=pa.string())
+                for name, values in zip(self.columns, columns, strict=True)
+            }
+        )
+        if self._writer is None:
+            self.part_path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = pq.ParquetWriter(self.part_path, table.schema)
+        self._writer.write_table(table)
+        self._batch = []
+
+    def _finish(self) -> None:
+        if self._batch:
+            self._flush()
+        self._writer.close()
+        self._writer = None
+        self.part_path.replace(self.path)
+
+    def _cleanup(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self.part_path.unlink(missing_ok=True)
+
+
+class ExcelInventoryWriter(InventoryWriter):
+    """
+    Stream inventory rows into a formatted .xlsx file.
+
+    Rows are spooled to a temporary CSV file as they arrive while column widths
+    are tracked, because openpyxl's write-only mode needs widths before the
+    first row. close() then writes the workbook in one write-only pass with
+    header style, frozen header row, auto-filter and column widths applied.
+    Memory use does not grow with the number of rows.
+    """
+
+    extension = ".xlsx"
+    label = "Excel"
+
+    def __init__(self, path: Path, columns: list[str] = INVENTORY_COLUMNS) -> None:
+        super().__init__(path, columns)
+        self._widths = [len(column) for column in columns]
+        self._spool = tempfile.TemporaryFile("w+", newline="", encoding="utf-8")
+        self._spool_writer = csv.writer(self._spool)
+
+    def _write(self, rows: list[list[str]]) -> None:
+        for row in rows:
+            for col_idx, value in enumerate(row):
+                self._widths[col_idx] = max(self._widths[col_idx], len(str(value)))
+        self._spool_writer.writerows(rows)
+
+    def _finish(self) -> None:
+        self._spool.seek(0)
+        self._write_workbook()
+
+    def _cleanup(self) -> None:
+        self._spool.close()
+
+    def _write_workbook(self) -> None:
+        # Imported on first use to keep CLI start-up fast.
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill
+        from openpyxl.utils import get_column_letter
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Sheet1")
+
+        # Auto-size columns based on max cell width
+        for col_idx, width in enumerate(self._widths, start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width + 2
+
+        # Freeze header row
+        ws.freeze_panes = "A2"
+
+        # Header style
+        header_fill = PatternFill("solid", fgColor="DDDDDD")
+        header_font = Font(bold=True)
+        header = []
+        for column in self.columns:
+            cell = WriteOnlyCell(ws, value=column)
+            cell.fill = header_fill
+            cell.font = header_font
+            header.append(cell)
+        ws.append(header)
+
+        for row in csv.reader(self._spool):
+            ws.append(row)
+
+        # Enable auto-filter
+        last_col = get_column_letter(len(self.columns))
+        ws.auto_filter.ref = f"A1:{last_col}{self.row_count + 1}"
+
+        wb.save(self.path)
+
+
+# Output format name -> writer class.
+WRITERS: dict[str, type[InventoryWriter]] = {
+    "xlsx": ExcelInventoryWriter,
+    "csv": CsvInventoryWriter,
+    "jsonl": JsonLinesInventoryWriter,
+    "parquet": ParquetInventoryWriter,
+}
+
+# Formats that need an optional package -> that package.
+_OPTIONAL_REQUIREMENTS = {"parquet": "pyarrow"}
+
+
+def missing_requirement(output_format: str) -> str | None:
+    """Name of the optional package output_format needs but is not installed, if any."""
+    package = _OPTIONAL_REQUIREMENTS.get(output_format)
+    if package and importlib.util.find_spec(package) is None:
+        return package
+    return None